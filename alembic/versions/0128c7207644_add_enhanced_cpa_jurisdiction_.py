@@ -7,8 +7,6 @@ Create Date: 2025-06-15 17:00:00.000000
 """
 
 from alembic import op
-import sqlalchemy as sa
-from sqlalchemy.types import DECIMAL
 
 
 # revision identifiers, used by Alembic.
@@ -18,86 +16,44 @@ branch_labels = None
 depends_on = None
 
 
-def upgrade() -> None:
-    """Add enhanced fields for comprehensive CPA jurisdiction requirements"""
-
-    # Add technical subject requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("technical_hours_required", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("technical_hours_per_year", sa.Integer(), nullable=True),
-    )
-
-    # Add regulatory review requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("regulatory_review_hours", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("regulatory_review_frequency_months", sa.Integer(), nullable=True),
-    )
-
-    # Add specialized requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("government_audit_hours", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("accounting_auditing_hours", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("preparation_engagement_hours", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("fraud_hours_required", sa.Integer(), nullable=True),
-    )
-
-    # Add new licensee requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("new_licensee_hours_per_six_months", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column(
-            "new_licensee_regulatory_review_required", sa.Boolean(), nullable=True
-        ),
-    )
+# (column, type) pairs added to cpa_jurisdictions, all nullable. Adding a
+# nullable column without a default is a catalog-only change in Postgres, so
+# issuing them all in one ALTER TABLE takes the exclusive lock only once.
+ENHANCED_COLUMNS = [
+    # Technical subject requirements
+    ("technical_hours_required", "INTEGER"),
+    ("technical_hours_per_year", "INTEGER"),
+    # Regulatory review requirements
+    ("regulatory_review_hours", "INTEGER"),
+    ("regulatory_review_frequency_months", "INTEGER"),
+    # Specialized requirements
+    ("government_audit_hours", "INTEGER"),
+    ("accounting_auditing_hours", "INTEGER"),
+    ("preparation_engagement_hours", "INTEGER"),
+    ("fraud_hours_required", "INTEGER"),
+    # New licensee requirements
+    ("new_licensee_hours_per_six_months", "INTEGER"),
+    ("new_licensee_regulatory_review_required", "BOOLEAN"),
+    # Course requirements
+    ("interactive_courses_required", "BOOLEAN"),
+    ("minimum_course_length_hours", "NUMERIC(3, 1)"),
+    ("ethics_course_minimum_length_hours", "NUMERIC(3, 1)"),
+    # Exam/test requirements
+    ("ethics_exam_passing_score", "INTEGER"),
+    ("regulatory_review_passing_score", "INTEGER"),
+    # Special requirements field
+    ("special_requirements", "TEXT"),
+]
 
-    # Add course requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("interactive_courses_required", sa.Boolean(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("minimum_course_length_hours", DECIMAL(3, 1), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("ethics_course_minimum_length_hours", DECIMAL(3, 1), nullable=True),
-    )
 
-    # Add exam/test requirements
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("ethics_exam_passing_score", sa.Integer(), nullable=True),
-    )
-    op.add_column(
-        "cpa_jurisdictions",
-        sa.Column("regulatory_review_passing_score", sa.Integer(), nullable=True),
-    )
+def upgrade() -> None:
+    """Add enhanced fields for comprehensive CPA jurisdiction requirements"""
 
-    # Add special requirements field
-    op.add_column(
-        "cpa_jurisdictions", sa.Column("special_requirements", sa.Text(), nullable=True)
+    op.execute(
+        "ALTER TABLE cpa_jurisdictions "
+        + ", ".join(
+            f"ADD COLUMN {name} {sql_type}" for name, sql_type in ENHANCED_COLUMNS
+        )
     )
 
 
@@ -105,19 +61,9 @@ def downgrade() -> None:
     """Remove enhanced CPA jurisdiction fields"""
 
     # Remove in reverse order
-    op.drop_column("cpa_jurisdictions", "special_requirements")
-    op.drop_column("cpa_jurisdictions", "regulatory_review_passing_score")
-    op.drop_column("cpa_jurisdictions", "ethics_exam_passing_score")
-    op.drop_column("cpa_jurisdictions", "ethics_course_minimum_length_hours")
-    op.drop_column("cpa_jurisdictions", "minimum_course_length_hours")
-    op.drop_column("cpa_jurisdictions", "interactive_courses_required")
-    op.drop_column("cpa_jurisdictions", "new_licensee_regulatory_review_required")
-    op.drop_column("cpa_jurisdictions", "new_licensee_hours_per_six_months")
-    op.drop_column("cpa_jurisdictions", "fraud_hours_required")
-    op.drop_column("cpa_jurisdictions", "preparation_engagement_hours")
-    op.drop_column("cpa_jurisdictions", "accounting_auditing_hours")
-    op.drop_column("cpa_jurisdictions", "government_audit_hours")
-    op.drop_column("cpa_jurisdictions", "regulatory_review_frequency_months")
-    op.drop_column("cpa_jurisdictions", "regulatory_review_hours")
-    op.drop_column("cpa_jurisdictions", "technical_hours_per_year")
-    op.drop_column("cpa_jurisdictions", "technical_hours_required")
+    op.execute(
+        "ALTER TABLE cpa_jurisdictions "
+        + ", ".join(
+            f"DROP COLUMN {name}" for name, _ in reversed(ENHANCED_COLUMNS)
+        )
+    )
@@ -0,0 +1,32 @@
+"""Add updated_at to cpe_records
+
+Revision ID: 4e8c1d2b9f63
+Revises: 7b3e2f9a1c54
+Create Date: 2025-06-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8c1d2b9f63'
+down_revision: Union[str, None] = '7b3e2f9a1c54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cpe_records', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Existing records were last written when they were extracted
+    op.execute(
+        "UPDATE cpe_records SET updated_at = coalesce(extracted_at, now() at time zone 'utc')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cpe_records', 'updated_at')
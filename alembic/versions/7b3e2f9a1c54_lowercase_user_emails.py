@@ -0,0 +1,58 @@
+"""Normalize user emails to lower case and index lower(email)
+
+Revision ID: 7b3e2f9a1c54
+Revises: 0128c7207644
+Create Date: 2025-06-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e2f9a1c54'
+down_revision: Union[str, None] = '0128c7207644'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Accounts whose emails differ only by case would collide on the unique
+    # ix_users_email once lower-cased. Merging them is a manual decision, so
+    # stop before changing anything and say which accounts they are.
+    conflicts = op.get_bind().execute(
+        sa.text(
+            "SELECT lower(email) AS email, array_agg(id ORDER BY id) AS ids "
+            "FROM users GROUP BY lower(email) HAVING count(*) > 1 "
+            "ORDER BY lower(email)"
+        )
+    ).all()
+    if conflicts:
+        details = "; ".join(
+            f"{row.email}: user ids {', '.join(map(str, row.ids))}"
+            for row in conflicts
+        )
+        raise RuntimeError(
+            "Cannot lower-case user emails: these accounts differ only by "
+            f"case and must be merged or renamed first - {details}"
+        )
+
+    # The app now stores and looks up emails in lower case, so the existing
+    # ix_users_email index serves every lookup
+    op.execute("UPDATE users SET email = lower(email) WHERE email <> lower(email)")
+
+    # Case-insensitive uniqueness; built CONCURRENTLY so users stays writable
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_lower "
+            "ON users (lower(email))"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_lower")
@@ -0,0 +1,42 @@
+"""Add keyset pagination indexes to cpe_records
+
+Revision ID: 9d4a6b3e7c21
+Revises: 4e8c1d2b9f63
+Create Date: 2025-06-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6b3e7c21'
+down_revision: Union[str, None] = '4e8c1d2b9f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, columns) - user_id first, then the sort field, then id
+PAGINATION_INDEXES = [
+    ("ix_cpe_records_user_completion_id", "user_id, completion_date, id"),
+    ("ix_cpe_records_user_course_name_id", "user_id, course_name, id"),
+    ("ix_cpe_records_user_credits_id", "user_id, cpe_credits, id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so cpe_records stays writable
+    with op.get_context().autocommit_block():
+        for name, columns in PAGINATION_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON cpe_records ({columns})"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in PAGINATION_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
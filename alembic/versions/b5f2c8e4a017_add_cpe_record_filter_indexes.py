@@ -0,0 +1,45 @@
+"""Add filter, sort and duplicate-check indexes to cpe_records
+
+Revision ID: b5f2c8e4a017
+Revises: 9d4a6b3e7c21
+Create Date: 2025-06-23 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2c8e4a017'
+down_revision: Union[str, None] = '9d4a6b3e7c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, columns)
+CPE_RECORD_INDEXES = [
+    ("ix_cpe_records_user_extracted_id", "user_id, extracted_at, id"),
+    (
+        "ix_cpe_records_user_field_completion_id",
+        "user_id, field_of_study, completion_date, id",
+    ),
+    ("ix_cpe_records_user_hash", "user_id, certificate_hash"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so cpe_records stays writable
+    with op.get_context().autocommit_block():
+        for name, columns in CPE_RECORD_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON cpe_records ({columns})"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in CPE_RECORD_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
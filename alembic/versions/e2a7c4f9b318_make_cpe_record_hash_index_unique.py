@@ -0,0 +1,116 @@
+"""Make the cpe_records (user_id, certificate_hash) index unique
+
+Revision ID: e2a7c4f9b318
+Revises: b5f2c8e4a017
+Create Date: 2025-06-24 10:00:00.000000
+
+"""
+import logging
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4f9b318'
+down_revision: Union[str, None] = 'b5f2c8e4a017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+UNIQUE_INDEX = "uq_cpe_records_user_hash"
+# Duplicate records removed by this migration, kept with all their columns
+ARCHIVE_TABLE = "cpe_records_duplicates_archive"
+BUILD_ATTEMPTS = 3
+
+
+def _unique_index_valid(bind) -> Optional[bool]:
+    """pg_index.indisvalid for the unique index, or None if it doesn't exist"""
+    return bind.execute(
+        sa.text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ),
+        {"name": UNIQUE_INDEX},
+    ).scalar()
+
+
+def _archive_duplicates(bind) -> None:
+    """Move every copy but the first of each (user_id, certificate_hash) aside"""
+    # One statement, so a row is never deleted without being archived
+    archived_ids = bind.execute(
+        sa.text(
+            "WITH moved AS ("
+            "  DELETE FROM cpe_records a USING cpe_records b"
+            "  WHERE a.user_id = b.user_id"
+            "  AND a.certificate_hash = b.certificate_hash"
+            "  AND a.id > b.id"
+            "  RETURNING a.*"
+            "), archived AS ("
+            f"  INSERT INTO {ARCHIVE_TABLE} SELECT * FROM moved RETURNING id"
+            ") SELECT id FROM archived ORDER BY id"
+        )
+    ).scalars().all()
+    if archived_ids:
+        logger.warning(
+            "Moved %d duplicate cpe_records to %s (their stored certificate "
+            "files are not touched): ids %s",
+            len(archived_ids),
+            ARCHIVE_TABLE,
+            ", ".join(map(str, archived_ids)),
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Uploads raced past the duplicate check could store the same file twice
+    # for a user; the first copy of each stays, the rest are archived
+    op.execute(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} (LIKE cpe_records)")
+
+    # Built CONCURRENTLY so cpe_records stays writable. A duplicate inserted
+    # between the archive step and the end of the build fails it and leaves
+    # an INVALID index, which IF NOT EXISTS would silently keep (and every
+    # ON CONFLICT insert would then fail), so check pg_index and retry.
+    with op.get_context().autocommit_block():
+        for _ in range(BUILD_ATTEMPTS):
+            if _unique_index_valid(bind) is False:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_INDEX}")
+            _archive_duplicates(bind)
+            try:
+                op.execute(
+                    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+                    f"{UNIQUE_INDEX} ON cpe_records (user_id, certificate_hash)"
+                )
+            except sa.exc.IntegrityError:
+                logger.warning("Duplicate inserted while building %s", UNIQUE_INDEX)
+            if _unique_index_valid(bind):
+                break
+        else:
+            if _unique_index_valid(bind) is False:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_INDEX}")
+            raise RuntimeError(
+                f"Could not build a valid {UNIQUE_INDEX} after "
+                f"{BUILD_ATTEMPTS} attempts"
+            )
+
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_cpe_records_user_hash")
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Only the indexes are restored. The duplicate records removed by the
+    upgrade are NOT put back into cpe_records; they stay in
+    cpe_records_duplicates_archive for manual recovery.
+    """
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cpe_records_user_hash "
+            "ON cpe_records (user_id, certificate_hash)"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_INDEX}")
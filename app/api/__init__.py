@@ -1,140 +1,93 @@
 # app/api/__init__.py - Updated with compliance router
 
-from fastapi import APIRouter
-
-# Create main API router
-api_router = APIRouter()
-
-print("🔍 Loading API routers...")
-
-# Import and include auth router
-try:
-    from .auth import router as auth_router
-
-    api_router.include_router(auth_router)
-    print("✅ Auth router loaded successfully")
-    print(f"   Auth routes: {[route.path for route in auth_router.routes]}")
-except ImportError as e:
-    print(f"⚠️  Auth router not available: {e}")
-    print("   → This is OK for testing without auth")
-except Exception as e:
-    print(f"❌ Unexpected error loading auth router: {e}")
-
-# Import and include jurisdiction requirements router
-try:
-    from .jurisdiction_requirements import router as jurisdiction_router
-
-    api_router.include_router(jurisdiction_router)
-    print("✅ Jurisdiction requirements router loaded successfully")
-    print(
-        f"   Jurisdiction routes: {[route.path for route in jurisdiction_router.routes]}"
-    )
-except ImportError as e:
-    print(f"⚠️  Jurisdiction requirements router not available: {e}")
-except Exception as e:
-    print(f"❌ Unexpected error loading jurisdiction requirements router: {e}")
-
-# Import and include compliance router
-try:
-    from .compliance import router as compliance_router
-
-    api_router.include_router(compliance_router)
-    print("✅ Compliance router loaded successfully")
-    print(f"   Compliance routes: {[route.path for route in compliance_router.routes]}")
-except ImportError as e:
-    print(f"⚠️  Compliance router not available: {e}")
-except Exception as e:
-    print(f"❌ Unexpected error loading compliance router: {e}")
-
-# Import and include certificate upload router
-try:
-    from .certificate_upload import router as upload_router
-
-    api_router.include_router(upload_router)
-    print("✅ Certificate upload router loaded successfully")
-    print(f"   Upload routes: {[route.path for route in upload_router.routes]}")
-except ImportError as e:
-    print(f"❌ Could not load certificate upload router: {e}")
-    import traceback
-
-    traceback.print_exc()
-except Exception as e:
-    print(f"❌ Unexpected error loading certificate upload router: {e}")
-    import traceback
-
-    traceback.print_exc()
-
-# Import and include certificate data router
-try:
-    from .certificate_data import router as data_router
-
-    api_router.include_router(data_router)
-    print("✅ Certificate data router loaded successfully")
-    print(f"   Data routes: {[route.path for route in data_router.routes]}")
-except ImportError as e:
-    print(f"⚠️  Certificate data router not available: {e}")
-except Exception as e:
-    print(f"❌ Unexpected error loading certificate data router: {e}")
-
-# Import and include CE Broker exports router
-try:
-    from .ce_broker_exports import router as exports_router
-
-    api_router.include_router(exports_router)
-    print("✅ CE Broker exports router loaded successfully")
-    print(f"   Export routes: {[route.path for route in exports_router.routes]}")
-except ImportError as e:
-    print(f"⚠️  CE Broker exports router not available: {e}")
-except Exception as e:
-    print(f"❌ Unexpected error loading CE Broker exports router: {e}")
-
-# Import and include file management router
-try:
-    from .file_management import router as files_router
-
-    api_router.include_router(files_router)
-    print("✅ File management router loaded successfully")
-    print(f"   File routes: {[route.path for route in files_router.routes]}")
-except ImportError as e:
-    print(f"⚠️  File management router not available: {e}")
-except Exception as e:
-    print(f"❌ Unexpected error loading file management router: {e}")
-
-print(f"🏁 Total API routes loaded: {len(api_router.routes)}")
-print("📁 Available routers:")
-print("   ├── auth.py (authentication)")
-print("   ├── jurisdiction_requirements.py (state requirements)")
-print("   ├── compliance.py (compliance checking)")
-print("   ├── certificate_upload.py (uploads)")
-print("   ├── certificate_data.py (data management)")
-print("   ├── ce_broker_exports.py (CE Broker)")
-print("   └── file_management.py (file operations)")
-
-# Verify critical routes are loaded
-upload_routes = [route.path for route in api_router.routes if "/upload" in route.path]
-if upload_routes:
-    print(f"✅ Upload functionality ready: {upload_routes}")
-else:
-    print("❌ No upload routes found - check certificate_upload.py")
-
-auth_routes = [route.path for route in api_router.routes if "/auth" in route.path]
-if auth_routes:
-    print(f"✅ Authentication ready: {len(auth_routes)} routes")
-else:
-    print("❌ No auth routes found - check auth.py")
-
-jurisdiction_routes = [
-    route.path for route in api_router.routes if "/jurisdictions" in route.path
+"""
+API router registry.
+
+Router modules are imported lazily: importing ``app.api`` is cheap, and the
+routers (with their SQLAlchemy, bcrypt and PDF/OCR dependencies) are only
+loaded when ``include_routers`` is called from ``app/main.py`` or a router
+module is accessed as an attribute (``app.api.auth``).
+
+Set ``SUPERCPE_EAGER_IMPORT=1`` to import every router module up front, so
+CI can check that they all import cleanly.
+"""
+
+import importlib
+import logging
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, FastAPI
+
+logger = logging.getLogger(__name__)
+
+# (module name, required) - a required router that fails to import stops
+# startup; optional ones are logged and skipped. Order is inclusion order.
+_ROUTERS = [
+    ("auth", True),
+    ("jurisdiction_requirements", False),
+    ("compliance", False),
+    ("certificate_upload", True),
+    ("certificate_data", False),
+    ("ce_broker_exports", False),
+    ("file_management", False),
 ]
-if jurisdiction_routes:
-    print(f"✅ Jurisdiction requirements ready: {len(jurisdiction_routes)} routes")
-else:
-    print("❌ No jurisdiction routes found - check jurisdiction_requirements.py")
+_ROUTER_NAMES = frozenset(name for name, _ in _ROUTERS)
 
-compliance_routes = [
-    route.path for route in api_router.routes if "/compliance" in route.path
-]
-if compliance_routes:
-    print(f"✅ Compliance checking ready: {len(compliance_routes)} routes")
-else:
-    print("❌ No compliance routes found - check compliance.py")
+
+def __getattr__(name: str):
+    """Import router modules on first access"""
+    if name in _ROUTER_NAMES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _load_router(name: str, required: bool) -> Optional[APIRouter]:
+    """Import one router module, returning None if an optional one fails"""
+    try:
+        router = importlib.import_module(f"{__name__}.{name}").router
+    except ImportError as e:
+        if required:
+            raise
+        logger.warning("%s router not available: %s", name, e)
+        return None
+    except Exception:
+        if required:
+            raise
+        logger.exception("Unexpected error loading %s router", name)
+        return None
+
+    logger.info("%s router loaded successfully", name)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s routes: %s", name, [route.path for route in router.routes])
+    return router
+
+
+def load_routers() -> List[APIRouter]:
+    """Import all router modules and return the routers that loaded"""
+    logger.info("Loading API routers...")
+
+    routers: List[APIRouter] = []
+    for name, required in _ROUTERS:
+        router = _load_router(name, required)
+        if router is not None:
+            routers.append(router)
+
+    return routers
+
+
+def include_routers(app: FastAPI) -> None:
+    """Load all API routers and include them directly on the app
+
+    A required router that fails to import raises out of here, so startup
+    stops instead of serving an app without it. There is no separate check
+    for missing critical routes.
+    """
+    for router in load_routers():
+        app.include_router(router)
+
+
+if os.getenv("SUPERCPE_EAGER_IMPORT") == "1":
+    # Let import errors propagate so a broken router fails CI loudly
+    for _name, _ in _ROUTERS:
+        importlib.import_module(f"{__name__}.{_name}")
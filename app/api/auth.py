@@ -1,15 +1,34 @@
 # app/api/auth.py - Fixed version with proper imports
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select, text, update
 from sqlalchemy.orm import Session
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
-import jwt
-from passlib.context import CryptContext
+import base64
+import hashlib
+import hmac
+import json
+import orjson
+import os
+import threading
+import time
+import warnings
+import bcrypt
 
 # Fixed imports - use absolute imports
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db
 from app.models import User
 from app.schemas.auth import (
     UserRegistration,
@@ -21,13 +40,36 @@ from app.schemas.auth import (
 )
 
 # Security setup
-SECRET_KEY = (
-    "your-secret-key-change-in-production"  # In production, use environment variable
-)
+# Read from the environment and encoded once; only the bytes are ever used.
+# There is no production fallback: the only default key is published in this
+# repo, so without SECRET_KEY startup fails unless DEBUG is explicitly on.
+_DEV_SECRET_KEY = "your-secret-key-change-in-production"
+_secret_key = os.getenv("SECRET_KEY")
+if not _secret_key:
+    if os.getenv("DEBUG", "").lower() not in ("1", "true", "yes"):
+        raise RuntimeError(
+            "SECRET_KEY is not set. Set it to a long random value "
+            "(or set DEBUG=true to use the insecure development key)."
+        )
+    warnings.warn(
+        "SECRET_KEY is not set; signing tokens with the development key",
+        RuntimeWarning,
+    )
+    _secret_key = _DEV_SECRET_KEY
+SECRET_KEY = _secret_key.encode("utf-8")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# last_login is only rewritten when older than this, so most logins skip the
+# UPDATE + commit entirely
+LAST_LOGIN_RESOLUTION = timedelta(minutes=15)
+
+# bcrypt cost 10 keeps a login at ~50ms of CPU instead of ~250ms at passlib's
+# default of 12; hashes made with another cost are upgraded on next login.
+BCRYPT_ROUNDS = 10
+_BCRYPT_CURRENT_PREFIX = f"$2b${BCRYPT_ROUNDS:02d}$"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 router = APIRouter(
@@ -36,72 +78,261 @@ router = APIRouter(
 )
 
 
+# Recently verified (password, hash) pairs, so a burst of logins from a client
+# that keeps losing its token pays for bcrypt once per window. Only successful
+# checks are cached, keyed by a digest - the plaintext is never stored.
+# BCRYPT_VERIFY_CACHE_TTL=0 disables the cache.
+VERIFY_CACHE_TTL_SECONDS = float(os.getenv("BCRYPT_VERIFY_CACHE_TTL", "60"))
+VERIFY_CACHE_MAX_SIZE = 4096
+_verify_cache: "OrderedDict[bytes, float]" = OrderedDict()
+_verify_cache_lock = threading.Lock()
+
+
+def _verify_cache_key(plain_password: str, hashed_password: str) -> bytes:
+    # BLAKE2b keyed with the stored hash (60 bytes, within its 64-byte key
+    # limit): a password change invalidates the entry, and the digest is
+    # useless without the hash it was made for
+    return hashlib.blake2b(
+        plain_password.encode("utf-8"), key=hashed_password.encode("utf-8")
+    ).digest()
+
+
 # Utility functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    if not hashed_password or len(hashed_password) != 60 or hashed_password[0] != "$":
+        # Not a bcrypt hash (e.g. placeholder users) - the C backend would
+        # reject or even panic on these
+        return False
+    if VERIFY_CACHE_TTL_SECONDS <= 0:
+        return _checkpw(plain_password, hashed_password)
+    key = _verify_cache_key(plain_password, hashed_password)
+    now = time.monotonic()
+    with _verify_cache_lock:
+        expires_at = _verify_cache.get(key)
+        if expires_at is not None:
+            if expires_at > now:
+                _verify_cache.move_to_end(key)
+                return True
+            del _verify_cache[key]
+
+    if not _checkpw(plain_password, hashed_password):
+        return False
+
+    with _verify_cache_lock:
+        _verify_cache[key] = now + VERIFY_CACHE_TTL_SECONDS
+        _verify_cache.move_to_end(key)
+        if len(_verify_cache) > VERIFY_CACHE_MAX_SIZE:
+            _verify_cache.popitem(last=False)
+    return True
+
+
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
+    # Passwords are truncated to 72 bytes (bcrypt's limit), exactly as passlib
+    # did when the older hashes were created.
+    try:
+        return bcrypt.checkpw(
+            plain_password.encode("utf-8")[:72], hashed_password.encode("utf-8")
+        )
+    except ValueError:
+        return False
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(
+        password.encode("utf-8")[:72], bcrypt.gensalt(BCRYPT_ROUNDS)
+    ).decode("ascii")
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True for hashes made with another bcrypt variant or cost"""
+    return not hashed_password.startswith(_BCRYPT_CURRENT_PREFIX)
+
+
+# JWT (HS256) - signed directly with hmac/hashlib, which use OpenSSL's
+# HMAC-SHA256, instead of going through PyJWT's generic algorithm dispatch
+class InvalidTokenError(Exception):
+    """Raised for malformed, wrongly signed or expired tokens"""
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+# The header never changes, so it is encoded once
+_JWT_HEADER_B64 = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+
+# Keyed once at import; copying it per token skips re-deriving the HMAC
+# inner/outer pad state from the key on every sign/verify
+_HMAC_TEMPLATE = hmac.new(SECRET_KEY, digestmod=hashlib.sha256)
+
+
+def _sign(signing_input: bytes) -> bytes:
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+
+def decode_token(token: str) -> dict:
+    """Verify an HS256 token issued by create_access_token and return its payload"""
+    try:
+        signing_input, _, signature = token.encode("ascii").rpartition(b".")
+        if signing_input.count(b".") != 1:
+            raise InvalidTokenError("Token must have three segments")
+        header_b64, _, payload_b64 = signing_input.partition(b".")
+        if header_b64 != _JWT_HEADER_B64:
+            raise InvalidTokenError("Unsupported token header")
+        if not hmac.compare_digest(_b64url_decode(signature), _sign(signing_input)):
+            raise InvalidTokenError("Signature verification failed")
+        payload = json.loads(_b64url_decode(payload_b64))
+    except ValueError as e:
+        raise InvalidTokenError(str(e)) from e
+
+    if not isinstance(payload, dict):
+        raise InvalidTokenError("Invalid payload")
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        raise InvalidTokenError("Token is missing exp or has expired")
+    return payload
+
+
+def create_access_token(email: str, user_id: int) -> str:
+    """Issue a token for the fixed {"sub", "user_id", "exp"} payload"""
+    # exp is a plain Unix timestamp, so skip datetime arithmetic entirely.
+    # The payload is assembled directly; json.dumps is only needed to quote
+    # and escape the email.
+    payload = '{"sub":%s,"user_id":%d,"exp":%d}' % (
+        json.dumps(email),
+        user_id,
+        int(time.time()) + _EXPIRE_SECONDS,
+    )
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url_encode(payload.encode())
+    return (signing_input + b"." + _b64url_encode(_sign(signing_input))).decode()
+
+
+# Tokens that recently passed validation -> user id, so repeat requests with
+# the same bearer token skip the HMAC check and payload parsing. Entries live
+# for at most TOKEN_CACHE_TTL_SECONDS and never past the token's own exp.
+TOKEN_CACHE_TTL_SECONDS = 30
+TOKEN_CACHE_MAX_SIZE = 10_000
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _cached_token_user_id(token: str) -> Optional[int]:
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return user_id
+
+
+def _cache_token_user_id(token: str, user_id: int, exp: float) -> None:
+    expires_at = min(time.time() + TOKEN_CACHE_TTL_SECONDS, exp)
+    with _token_cache_lock:
+        _token_cache[token] = (user_id, expires_at)
+        _token_cache.move_to_end(token)
+        if len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+
+
+# Raised for every rejected token; its contents never change, so it is built
+# once. with_traceback(None) stops tracebacks accumulating across raises.
+CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    user_id = _cached_token_user_id(token)
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user is None:
+            raise CREDENTIALS_EXCEPTION.with_traceback(None)
+        return user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         if email is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
+            raise CREDENTIALS_EXCEPTION.with_traceback(None)
+    except InvalidTokenError:
+        raise CREDENTIALS_EXCEPTION.with_traceback(None)
+
+    # Tokens carry the user id, so resolve by primary key (identity-map hit
+    # within the session); fall back to email for tokens without user_id
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user is not None:
+            _cache_token_user_id(token, user_id, payload["exp"])
+    else:
+        user = db.query(User).filter(User.email == email.lower()).first()
     if user is None:
-        raise credentials_exception
+        raise CREDENTIALS_EXCEPTION.with_traceback(None)
     return user
 
 
+def _record_last_login(user_id: int, login_time: datetime) -> None:
+    """Background task: store last_login in its own short transaction"""
+    db = SessionLocal()
+    try:
+        # Losing this write in a crash is harmless, so don't wait on the WAL flush
+        db.execute(text("SET LOCAL synchronous_commit = off"))
+        db.execute(
+            update(User).where(User.id == user_id).values(last_login=login_time)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
 # Endpoints
+# /test is a constant health probe; encode its body once
+_TEST_BODY = orjson.dumps(
+    {"message": "Auth router is working with JWT!", "version": "2.0"}
+)
+
+
 @router.get("/test")
 async def test_auth():
-    return {"message": "Auth router is working with JWT!", "version": "2.0"}
+    return Response(content=_TEST_BODY, media_type="application/json")
 
 
 @router.post("/register", response_model=RegistrationResponse)
 async def register(user_data: UserRegistration, db: Session = Depends(get_db)):
     """Register a new user with configurable jurisdiction"""
 
+    # Emails are stored lower-cased so lookups can use the plain email index
+    email = user_data.email.lower()
+
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
+    existing_user_id = db.execute(select(User.id).where(User.email == email)).scalar()
+    if existing_user_id is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    # Hash the password (off the event loop - bcrypt is CPU bound)
+    hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
 
     # Create new user - use jurisdiction from request or default to NH
+    now = datetime.utcnow()
     user = User(
-        email=user_data.email,
+        email=email,
         password_hash=hashed_password,
         full_name=user_data.full_name,
         primary_jurisdiction=user_data.primary_jurisdiction,
@@ -109,55 +340,69 @@ async def register(user_data: UserRegistration, db: Session = Depends(get_db)):
         is_active=True,
         email_reminders=True,
         newsletter_subscription=False,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
+        created_at=now,
+        updated_at=now,
     )
 
+    # The INSERT's RETURNING fills in the id on flush; everything else the
+    # response needs is already known, so there is no refresh SELECT (and no
+    # attribute access after commit, which would reload the expired row)
     db.add(user)
+    db.flush()
+    user_id = user.id
     db.commit()
-    db.refresh(user)
 
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
-    )
+    access_token = create_access_token(email, user_id)
 
     token = Token(
         access_token=access_token,
         token_type="bearer",
         expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        user_id=user.id,
+        user_id=user_id,
     )
 
     return RegistrationResponse(
-        message=f"Welcome to SuperCPE, {user.full_name}!",
-        user_id=user.id,
+        message=f"Welcome to SuperCPE, {user_data.full_name}!",
+        user_id=user_id,
         next_step="basic_info",
         token=token,
     )
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login_json(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_json(
+    login_data: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Login with JSON data"""
 
-    user = db.query(User).filter(User.email == login_data.email).first()
-    if not user or not verify_password(login_data.password, user.password_hash):
+    user = db.query(User).filter(User.email == login_data.email.lower()).first()
+    if not user or not await run_in_threadpool(
+        verify_password, login_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
 
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Upgrade hashes made with an older cost/scheme while we have the password
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await run_in_threadpool(
+            get_password_hash, login_data.password
+        )
+
+    if db.is_modified(user):
+        db.commit()
+
+    # Update last login after the response has been sent
+    now = datetime.utcnow()
+    if user.last_login is None or now - user.last_login > LAST_LOGIN_RESOLUTION:
+        background_tasks.add_task(_record_last_login, user.id, now)
 
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
-    )
+    access_token = create_access_token(user.email, user.id)
 
     token = Token(
         access_token=access_token,
@@ -166,105 +411,50 @@ async def login_json(login_data: UserLogin, db: Session = Depends(get_db)):
         user_id=user.id,
     )
 
-    # Build user profile - only use fields that exist in your User model
-    user_profile = UserProfile(
-        id=user.id,
-        email=user.email,
-        full_name=user.full_name,
-        primary_jurisdiction=getattr(user, "primary_jurisdiction", None),
-        license_number=getattr(user, "license_number", None),
-        # Safe defaults for fields that might not exist in User model
-        license_issue_date=getattr(user, "license_issue_date", None),
-        next_renewal_date=getattr(user, "next_renewal_date", None),
-        secondary_jurisdictions=getattr(user, "secondary_jurisdictions", None),
-        phone_number=getattr(user, "phone_number", None),
-        linkedin_url=getattr(user, "linkedin_url", None),
-        twitter_handle=getattr(user, "twitter_handle", None),
-        facebook_url=getattr(user, "facebook_url", None),
-        instagram_handle=getattr(user, "instagram_handle", None),
-        website_url=getattr(user, "website_url", None),
-        firm_name=getattr(user, "firm_name", None),
-        firm_website=getattr(user, "firm_website", None),
-        firm_phone=getattr(user, "firm_phone", None),
-        firm_address_line1=getattr(user, "firm_address_line1", None),
-        firm_address_line2=getattr(user, "firm_address_line2", None),
-        firm_city=getattr(user, "firm_city", None),
-        firm_state=getattr(user, "firm_state", None),
-        firm_zip_code=getattr(user, "firm_zip_code", None),
-        job_title=getattr(user, "job_title", None),
-        years_experience=getattr(user, "years_experience", None),
-        specializations=getattr(user, "specializations", None),
-        professional_certifications=getattr(user, "professional_certifications", None),
-        ce_broker_auto_sync=getattr(user, "ce_broker_auto_sync", False),
-        email_reminders=getattr(user, "email_reminders", True),
-        newsletter_subscription=getattr(user, "newsletter_subscription", False),
-        marketing_emails=getattr(user, "marketing_emails", False),
-        public_profile=getattr(user, "public_profile", False),
-        onboarding_step=getattr(user, "onboarding_step", "registration"),
-        created_at=user.created_at,
-    )
+    user_profile = UserProfile.model_validate(user)
 
     return LoginResponse(
         message=f"Welcome back, {user.full_name}!",
         token=token,
         user=user_profile,
-        onboarding_required=(
-            getattr(user, "onboarding_step", "registration") != "complete"
-        ),
+        onboarding_required=user.onboarding_step != "complete",
     )
 
 
 @router.get("/me", response_model=UserProfile)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
     """Get current authenticated user profile"""
 
-    return UserProfile(
-        id=current_user.id,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        primary_jurisdiction=getattr(current_user, "primary_jurisdiction", None),
-        license_number=getattr(current_user, "license_number", None),
-        # Safe defaults for fields that might not exist in User model
-        license_issue_date=getattr(current_user, "license_issue_date", None),
-        next_renewal_date=getattr(current_user, "next_renewal_date", None),
-        secondary_jurisdictions=getattr(current_user, "secondary_jurisdictions", None),
-        phone_number=getattr(current_user, "phone_number", None),
-        linkedin_url=getattr(current_user, "linkedin_url", None),
-        twitter_handle=getattr(current_user, "twitter_handle", None),
-        facebook_url=getattr(current_user, "facebook_url", None),
-        instagram_handle=getattr(current_user, "instagram_handle", None),
-        website_url=getattr(current_user, "website_url", None),
-        firm_name=getattr(current_user, "firm_name", None),
-        firm_website=getattr(current_user, "firm_website", None),
-        firm_phone=getattr(current_user, "firm_phone", None),
-        firm_address_line1=getattr(current_user, "firm_address_line1", None),
-        firm_address_line2=getattr(current_user, "firm_address_line2", None),
-        firm_city=getattr(current_user, "firm_city", None),
-        firm_state=getattr(current_user, "firm_state", None),
-        firm_zip_code=getattr(current_user, "firm_zip_code", None),
-        job_title=getattr(current_user, "job_title", None),
-        years_experience=getattr(current_user, "years_experience", None),
-        specializations=getattr(current_user, "specializations", None),
-        professional_certifications=getattr(
-            current_user, "professional_certifications", None
-        ),
-        ce_broker_auto_sync=getattr(current_user, "ce_broker_auto_sync", False),
-        email_reminders=getattr(current_user, "email_reminders", True),
-        newsletter_subscription=getattr(current_user, "newsletter_subscription", False),
-        marketing_emails=getattr(current_user, "marketing_emails", False),
-        public_profile=getattr(current_user, "public_profile", False),
-        onboarding_step=getattr(current_user, "onboarding_step", "registration"),
-        created_at=current_user.created_at,
-    )
+    # updated_at moves on every profile write, so it versions the response;
+    # a client revalidating an unchanged profile gets an empty 304
+    if current_user.updated_at is not None:
+        etag = f'W/"{current_user.id}-{current_user.updated_at.timestamp():.6f}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return UserProfile.model_validate(current_user)
 
 
 @router.get("/test-protected")
 async def test_protected_endpoint(current_user: User = Depends(get_current_user)):
     """Test protected endpoint that requires authentication"""
 
-    return {
-        "message": f"Hello {current_user.full_name}! This is a protected endpoint.",
-        "user_id": current_user.id,
-        "email": current_user.email,
-        "access_time": datetime.utcnow().isoformat(),
-    }
+    return Response(
+        content=orjson.dumps(
+            {
+                "message": (
+                    f"Hello {current_user.full_name}! This is a protected endpoint."
+                ),
+                "user_id": current_user.id,
+                "email": current_user.email,
+                "access_time": datetime.utcnow().isoformat(),
+            }
+        ),
+        media_type="application/json",
+    )
@@ -3,29 +3,65 @@ CE Broker Automation API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
+from sqlalchemy import Float, cast, select, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 import io
+import textwrap
+import orjson
 
 from ..core.database import get_db
 from ..models import CPERecord
 from .certificate_data import get_or_create_default_user
+from .shared.filename_utils import user_filename_part
 from ..services.ce_broker_service import (
     CEBrokerMappingService, 
     CEBrokerReportGenerator,
     CEBrokerSubmission
 )
 
+# Endpoints that touch the database or reportlab are plain (sync) functions,
+# so FastAPI runs them in its threadpool instead of on the event loop
 router = APIRouter(
     prefix="/api/ce-broker",
     tags=["CE Broker Automation"],
     responses={404: {"description": "Not found"}},
 )
 
+# The submission steps are static, so build them (and the JSON body served by
+# /submission-guide) once rather than per request
+_SUBMISSION_INSTRUCTIONS = CEBrokerReportGenerator(None)._get_submission_instructions()
+_SUBMISSION_GUIDE_JSON = orjson.dumps(_SUBMISSION_INSTRUCTIONS)
+
+# CPERecord columns read by CEBrokerMappingService.map_cpe_record_to_submission
+_SUBMISSION_COLUMNS = (
+    CPERecord.id,
+    CPERecord.is_ethics,
+    CPERecord.delivery_method,
+    CPERecord.field_of_study,
+    CPERecord.completion_date,
+    cast(CPERecord.cpe_credits, Float).label("cpe_credits"),
+    CPERecord.course_name,
+    CPERecord.provider_name,
+    CPERecord.certificate_url,
+)
+
+# Pre-rendered text for each step of the instructions PDF:
+# (title, wrapped description lines, action, automation note or None)
+_PDF_STEP_BLOCKS = [
+    (
+        f"Step {step['step']}: {step['title']}",
+        textwrap.wrap(step["description"], 80) or [""],
+        f"Action: {step['action']}",
+        step.get("automation_note"),
+    )
+    for step in _SUBMISSION_INSTRUCTIONS["steps"]
+]
+
 @router.get("/prepare-submissions")
-async def prepare_ce_broker_submissions(
+def prepare_ce_broker_submissions(
     db: Session = Depends(get_db),
     category_filter: Optional[str] = None,
     include_submitted: bool = False
@@ -34,28 +70,31 @@ async def prepare_ce_broker_submissions(
     try:
         user = get_or_create_default_user(db)
         
-        # Get certificates
-        query = db.query(CPERecord).filter(CPERecord.user_id == user.id)
+        # Get certificates - only the columns the CE Broker mapping reads,
+        # fetched in batches so no full ORM objects are built or kept around
+        stmt = select(*_SUBMISSION_COLUMNS).where(CPERecord.user_id == user.id)
         
         # Filter out already submitted if requested
         if not include_submitted:
-            query = query.filter(CPERecord.ce_broker_submitted == False)
+            stmt = stmt.where(CPERecord.ce_broker_submitted == False)
         
-        certificates = query.order_by(CPERecord.completion_date.desc()).all()
+        stmt = stmt.order_by(CPERecord.completion_date.desc()).execution_options(
+            yield_per=200
+        )
+        
+        # Convert to CE Broker submissions
+        submissions = [
+            CEBrokerMappingService.map_cpe_record_to_submission(row)
+            for row in db.execute(stmt)
+        ]
         
-        if not certificates:
+        if not submissions:
             return {
                 "status": "no_certificates",
                 "message": "No certificates available for CE Broker submission",
                 "total_certificates": 0
             }
         
-        # Convert to CE Broker submissions
-        submissions = []
-        for cert in certificates:
-            submission = CEBrokerMappingService.map_cpe_record_to_submission(cert)
-            submissions.append(submission)
-        
         # Generate report
         report_generator = CEBrokerReportGenerator(db)
         report = report_generator.generate_submission_report(submissions)
@@ -79,11 +118,10 @@ async def prepare_ce_broker_submissions(
 @router.get("/submission-guide")
 async def get_submission_guide():
     """Get the complete CE Broker submission guide"""
-    generator = CEBrokerReportGenerator(None)
-    return generator._get_submission_instructions()
+    return Response(content=_SUBMISSION_GUIDE_JSON, media_type="application/json")
 
 @router.post("/mark-submitted")
-async def mark_certificates_submitted(
+def mark_certificates_submitted(
     certificate_ids: List[int],
     db: Session = Depends(get_db)
 ):
@@ -91,17 +129,22 @@ async def mark_certificates_submitted(
     try:
         user = get_or_create_default_user(db)
         
-        updated_count = 0
-        for cert_id in certificate_ids:
-            cert = db.query(CPERecord).filter(
-                CPERecord.id == cert_id,
-                CPERecord.user_id == user.id
-            ).first()
-            
-            if cert:
-                cert.ce_broker_submitted = True
-                cert.ce_broker_submission_date = datetime.now()
-                updated_count += 1
+        # One UPDATE ... RETURNING for the whole batch instead of a SELECT
+        # per certificate; ids that don't belong to the user are skipped
+        stmt = (
+            update(CPERecord)
+            .where(
+                CPERecord.user_id == user.id,
+                CPERecord.id.in_(certificate_ids)
+            )
+            .values(
+                ce_broker_submitted=True,
+                ce_broker_submission_date=datetime.utcnow()
+            )
+            .returning(CPERecord.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated_count = len(db.execute(stmt).scalars().all())
         
         db.commit()
         
@@ -119,15 +162,13 @@ async def mark_certificates_submitted(
         )
 
 @router.get("/export-instructions.pdf")
-async def download_submission_instructions(db: Session = Depends(get_db)):
+def download_submission_instructions(db: Session = Depends(get_db)):
     """Download detailed CE Broker submission instructions as PDF"""
     try:
         from reportlab.pdfgen import canvas
         from reportlab.lib.pagesizes import letter
         
         user = get_or_create_default_user(db)
-        generator = CEBrokerReportGenerator(db)
-        instructions = generator._get_submission_instructions()
         
         buffer = io.BytesIO()
         p = canvas.Canvas(buffer, pagesize=letter)
@@ -150,45 +191,37 @@ async def download_submission_instructions(db: Session = Depends(get_db)):
         p.drawString(50, y, "11-Step CE Broker Submission Process")
         y -= 30
         
-        for step in instructions["steps"]:
+        # One text object (a single BT/ET block) per step
+        for title, description_lines, action, note in _PDF_STEP_BLOCKS:
             if y < 100:  # New page if needed
                 p.showPage()
                 y = height - 50
             
-            p.setFont("Helvetica-Bold", 11)
-            p.drawString(50, y, f"Step {step['step']}: {step['title']}")
-            y -= 20
-            
-            p.setFont("Helvetica", 10)
-            # Wrap long descriptions
-            description = step["description"]
-            if len(description) > 80:
-                line1 = description[:80]
-                line2 = description[80:]
-                p.drawString(70, y, line1)
-                y -= 15
-                p.drawString(70, y, line2)
-            else:
-                p.drawString(70, y, description)
+            text = p.beginText(50, y)
+            text.setFont("Helvetica-Bold", 11)
+            text.textOut(title)
             
-            y -= 15
-            p.drawString(70, y, f"Action: {step['action']}")
+            text.setTextOrigin(70, y - 20)
+            text.setFont("Helvetica", 10, leading=15)
+            text.textLines(description_lines + [action])
+            y -= 20 + 15 * len(description_lines)  # now at the action line
             
-            if "automation_note" in step:
+            if note:
+                text.setFont("Helvetica-Oblique", 9, leading=15)
+                text.textLine(f"SuperCPE: {note}")
                 y -= 15
-                p.setFont("Helvetica-Oblique", 9)
-                p.drawString(70, y, f"SuperCPE: {step['automation_note']}")
-                p.setFont("Helvetica", 10)
             
+            p.drawText(text)
             y -= 25
         
         p.save()
-        buffer.seek(0)
         
-        filename = f"ce_broker_guide_{user.full_name.replace(' ', '_')}.pdf"
+        filename = f"ce_broker_guide_{user_filename_part(user.full_name)}.pdf"
         
-        return StreamingResponse(
-            buffer,
+        # Send the finished PDF as one body with a Content-Length; streaming a
+        # BytesIO iterates it line by line and sends many tiny chunks
+        return Response(
+            content=buffer.getvalue(),
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -5,71 +5,172 @@ CE Broker export and reporting endpoints.
 Handles all CE Broker format exports including CSV, PDF, and JSON reports.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlalchemy import Float, cast, func, select
 from sqlalchemy.orm import Session
 from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional, Sequence
+from contextlib import contextmanager
 import csv
+import hashlib
 import io
+import itertools
+import operator
+import os
+import textwrap
+import threading
 
 from ..core.database import get_db
 from ..models import CPERecord
 from .certificate_data import get_or_create_default_user
 from .shared.ce_broker_mapping import (
-    format_ce_broker_record,
+    format_ce_broker_records,
     get_ce_broker_instructions,
 )
-from .shared.filename_utils import generate_suggested_filename_with_extension
+from .shared.filename_utils import user_filename_part
 
 
+# The endpoints are plain (sync) functions: they run blocking SQLAlchemy and
+# reportlab work, so FastAPI runs them in its threadpool instead of on the
+# event loop
 router = APIRouter(
     prefix="/api/certificates/ce-broker",
     tags=["CE Broker Exports"],
     responses={404: {"description": "Not found"}},
 )
 
+# The CPERecord columns format_ce_broker_record() reads. Exports select just
+# these as plain rows rather than loading full ORM objects; credits come back
+# as floats instead of Decimals.
+_CE_BROKER_RECORD_COLUMNS = (
+    CPERecord.course_name,
+    CPERecord.provider_name,
+    CPERecord.completion_date,
+    cast(CPERecord.cpe_credits, Float).label("cpe_credits"),
+    CPERecord.delivery_method,
+    CPERecord.course_code,
+    CPERecord.field_of_study,
+    CPERecord.certificate_filename,
+    CPERecord.nasba_sponsor_id,
+)
+
+
+# Exports are regenerated on every request, so clients revalidate with
+# If-None-Match and get a 304 while nothing has changed
+_EXPORT_CACHE_CONTROL = "private, no-cache"
+
+
+def _ce_broker_records_query(user_id: int):
+    """A user's certificates for export, newest first, fetched in batches"""
+    return (
+        select(*_CE_BROKER_RECORD_COLUMNS)
+        .where(CPERecord.user_id == user_id)
+        .order_by(CPERecord.completion_date.desc())
+        .execution_options(yield_per=200)
+    )
+
+
+def _export_state(db: Session, user_id: int):
+    """(certificate count, latest certificate change) for a user's exports"""
+    return db.execute(
+        select(func.count(CPERecord.id), func.max(CPERecord.updated_at)).where(
+            CPERecord.user_id == user_id
+        )
+    ).one()
+
+
+def _export_etag(user, certificate_count: int, last_updated) -> str:
+    """Validator for a user's exports
+
+    Changes whenever a certificate is added, edited or deleted, or the user's
+    profile (printed in the report header) is updated.
+
+    Weak, like the /me profile ETag: the same version of an export isn't
+    byte-identical (report timestamps, dated filenames, gzip).
+    """
+    key = f"{user.id}|{user.updated_at}|{certificate_count}|{last_updated}"
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """An empty 304 if the client already has this version of the export"""
+    # If-None-Match uses the weak comparison and may list several ETags
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": _EXPORT_CACHE_CONTROL},
+        )
+    return None
+
+
+def _with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _EXPORT_CACHE_CONTROL
+    return response
+
+
+def _iter_ce_broker_records(db: Session, user_id: int) -> Iterator[dict]:
+    """Stream a user's certificates as CE Broker records (see above)"""
+    return format_ce_broker_records(db.execute(_ce_broker_records_query(user_id)))
+
 
 @router.get("/report")
-async def get_ce_broker_report(
-    db: Session = Depends(get_db), format: str = "json"  # json or csv
+def get_ce_broker_report(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: str = "json",  # json or csv
 ):
     """Get CE Broker formatted report of all certificates"""
     try:
         # Get existing user
         user = get_or_create_default_user(db)
 
-        # Get all certificates for this user
-        certificates = (
-            db.query(CPERecord)
-            .filter(CPERecord.user_id == user.id)
-            .order_by(CPERecord.completion_date.desc())
-            .all()
+        # Counts and credit totals per field of study, aggregated in SQL (the
+        # credits as exact NUMERIC, converted to float once per total). Empty
+        # fields count as "General", as format_ce_broker_record() reports them
+        field_of_study = func.coalesce(
+            func.nullif(CPERecord.field_of_study, ""), "General"
         )
+        field_rows = db.execute(
+            select(
+                field_of_study,
+                func.count(CPERecord.id),
+                func.sum(CPERecord.cpe_credits),
+                func.max(CPERecord.updated_at),
+            )
+            .where(CPERecord.user_id == user.id)
+            .group_by(field_of_study)
+            .order_by(field_of_study)
+        ).all()
 
-        if not certificates:
+        if not field_rows:
             return {
                 "status": "no_data",
                 "message": "No certificates found. Upload some certificates first.",
                 "user_id": user.id,
             }
 
-        # Format data for CE Broker
-        ce_broker_data = []
-        total_credits = 0
+        total_certificates = sum(row[1] for row in field_rows)
+        etag = _export_etag(user, total_certificates, max(row[3] for row in field_rows))
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-        for cert in certificates:
-            ce_record = format_ce_broker_record(cert)
-            ce_broker_data.append(ce_record)
-            total_credits += float(cert.cpe_credits)
+        ce_broker_data = _iter_ce_broker_records(db, user.id)
+
+        if format.lower() == "csv":
+            # Return as CSV download - the summary isn't part of the file
+            return _with_etag(generate_ce_broker_csv(ce_broker_data, user), etag)
 
         # Summary by field of study
-        field_summary = {}
-        for record in ce_broker_data:
-            field = record["field_of_study"]
-            if field not in field_summary:
-                field_summary[field] = {"count": 0, "credits": 0}
-            field_summary[field]["count"] += 1
-            field_summary[field]["credits"] += record["credits"]
+        field_summary = {
+            field: {"count": count, "credits": float(credits or 0)}
+            for field, count, credits, _ in field_rows
+        }
 
         report_data = {
             "user_info": {
@@ -80,22 +181,26 @@ async def get_ce_broker_report(
                 "license_number": user.license_number,
             },
             "summary": {
-                "total_certificates": len(certificates),
-                "total_credits": total_credits,
+                "total_certificates": total_certificates,
+                "total_credits": float(
+                    sum((row[2] or 0 for row in field_rows), Decimal(0))
+                ),
                 "by_field_of_study": field_summary,
-                "report_generated": datetime.utcnow().isoformat(),
+                "report_generated": datetime.utcnow(),
             },
-            "certificates": ce_broker_data,
-            "ce_broker_instructions": get_ce_broker_instructions(),
+            "certificates": list(ce_broker_data),
+            "ce_broker_instructions": _CE_BROKER_INSTRUCTIONS,
         }
 
-        if format.lower() == "csv":
-            # Return as CSV download
-            return await generate_ce_broker_csv(ce_broker_data, user)
-        else:
-            # Return as JSON
-            return {"status": "success", "report": report_data}
+        # Serialized straight by orjson (datetimes included), skipping
+        # FastAPI's jsonable_encoder pass over every certificate
+        return _with_etag(
+            ORJSONResponse({"status": "success", "report": report_data}), etag
+        )
 
+    except HTTPException:
+        # 404s and the like pass through instead of becoming a 500
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Report generation failed: {str(e)}"
@@ -103,215 +208,296 @@ async def get_ce_broker_report(
 
 
 @router.get("/export.csv")
-async def download_ce_broker_csv(db: Session = Depends(get_db)):
+def download_ce_broker_csv(request: Request, db: Session = Depends(get_db)):
     """Download CE Broker data as CSV file"""
     try:
         user = get_or_create_default_user(db)
 
-        certificates = (
-            db.query(CPERecord)
-            .filter(CPERecord.user_id == user.id)
-            .order_by(CPERecord.completion_date.desc())
-            .all()
-        )
-
-        if not certificates:
+        certificate_count, last_updated = _export_state(db, user.id)
+        if not certificate_count:
             raise HTTPException(status_code=404, detail="No certificates found")
 
-        # Format data for CE Broker CSV
-        ce_broker_data = []
-        for cert in certificates:
-            ce_record = format_ce_broker_record(cert)
-
-            # Convert to CSV format with proper headers
-            csv_record = {
-                "Course Name": ce_record["course_name"],
-                "Provider Name": ce_record["provider_name"],
-                "Completion Date": ce_record["completion_date"],
-                "Credits": ce_record["credits"],
-                "Delivery Method": ce_record["delivery_method"],
-                "Subject Areas": ce_record["subject_areas"],
-                "Course Code": ce_record["course_code"],
-                "Field of Study": ce_record["field_of_study"],
-                "Certificate File": ce_record["certificate_filename"],
-                "NASBA Sponsor": ce_record["nasba_sponsor"],
-            }
-            ce_broker_data.append(csv_record)
+        etag = _export_etag(user, certificate_count, last_updated)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-        return await generate_ce_broker_csv(ce_broker_data, user)
+        # Rows are fetched 200 at a time while the CSV is being sent
+        csv_rows = map(_to_csv_row, _iter_ce_broker_records(db, user.id))
 
+        response = csv_streaming_response(
+            _CSV_HEADERS, csv_rows, _report_filename(user, "csv")
+        )
+        return _with_etag(response, etag)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"CSV export failed: {str(e)}")
 
 
 @router.get("/export.pdf")
-async def download_ce_broker_simple_pdf(db: Session = Depends(get_db)):
+def download_ce_broker_simple_pdf(request: Request, db: Session = Depends(get_db)):
     """Download CE Broker data as a simple PDF file"""
     try:
         user = get_or_create_default_user(db)
 
-        certificates = (
-            db.query(CPERecord)
-            .filter(CPERecord.user_id == user.id)
-            .order_by(CPERecord.completion_date.desc())
-            .all()
-        )
-
-        if not certificates:
+        # Totals come from SQL so the certificate rows can be streamed into
+        # the PDF one batch at a time instead of being loaded up front
+        certificate_count, total_credits, last_updated = db.execute(
+            select(
+                func.count(CPERecord.id),
+                # Summed as NUMERIC, then converted once
+                cast(func.coalesce(func.sum(CPERecord.cpe_credits), 0), Float),
+                func.max(CPERecord.updated_at),
+            ).where(CPERecord.user_id == user.id)
+        ).one()
+
+        if not certificate_count:
             raise HTTPException(status_code=404, detail="No certificates found")
 
-        # Create PDF using simple canvas approach
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import letter
-
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-
-        # Title
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, height - 50, "CE Broker Submission Report")
-
-        # User info
-        y = height - 100
-        p.setFont("Helvetica", 12)
-        p.drawString(50, y, f"Name: {user.full_name or 'N/A'}")
-        y -= 20
-        p.drawString(50, y, f"Email: {user.email or 'N/A'}")
-        y -= 20
-        p.drawString(50, y, f"License: {user.license_number or 'N/A'}")
-        y -= 20
-        p.drawString(50, y, f"Jurisdiction: {user.primary_jurisdiction or 'N/A'}")
-        y -= 20
-        p.drawString(50, y, f"Report Date: {datetime.now().strftime('%m/%d/%Y')}")
-
-        # Summary
-        y -= 40
-        total_credits = sum(float(cert.cpe_credits) for cert in certificates)
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Summary")
-        y -= 25
-        p.setFont("Helvetica", 12)
-        p.drawString(50, y, f"Total Certificates: {len(certificates)}")
-        y -= 20
-        p.drawString(50, y, f"Total Credits: {total_credits:.1f}")
-
-        # Certificate list header
-        y -= 40
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(50, y, "Certificates for CE Broker Submission")
-        y -= 30
-
-        # Instructions
-        p.setFont("Helvetica", 10)
-        p.drawString(
-            50, y, "Instructions: Copy the information below into CE Broker forms"
-        )
-        y -= 15
-        p.drawString(50, y, "Provider for all courses: Professional Education Services")
-        y -= 15
-        p.drawString(
-            50,
-            y,
-            "Delivery Method for all: Computer-Based Training (ie: online courses)",
-        )
-        y -= 30
-
-        # Certificate details
-        for i, cert in enumerate(certificates, 1):
-            # Check if we need a new page
-            if y < 100:
-                p.showPage()
-                y = height - 50
-
-            ce_record = format_ce_broker_record(cert)
-
-            p.setFont("Helvetica-Bold", 11)
-            p.drawString(50, y, f"Certificate #{i}")
-            y -= 20
-
-            p.setFont("Helvetica", 10)
-
-            # Course name (might be long, so wrap it)
-            course_name = ce_record["course_name"]
-            if len(course_name) > 80:
-                line1 = course_name[:80]
-                line2 = course_name[80:]
-                p.drawString(70, y, f"Course: {line1}")
-                y -= 15
-                p.drawString(70, y, f"        {line2}")
-            else:
-                p.drawString(70, y, f"Course: {course_name}")
-
-            y -= 15
-            p.drawString(70, y, f"Provider: {ce_record['provider_name']}")
-            y -= 15
-            p.drawString(70, y, f"Date: {ce_record['completion_date']}")
-            y -= 15
-            p.drawString(70, y, f"Credits: {ce_record['credits']:.1f}")
-            y -= 15
-            p.drawString(70, y, f"Subject Areas: {ce_record['subject_areas']}")
-            y -= 15
-            p.drawString(70, y, f"Course Code: {ce_record['course_code'] or 'N/A'}")
-            y -= 15
-            p.drawString(
-                70, y, f"Certificate File: {ce_record['certificate_filename'] or 'N/A'}"
-            )
-            y -= 25
+        etag = _export_etag(user, certificate_count, last_updated)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-        # Save PDF
-        p.save()
-        buffer.seek(0)
+        # One timestamp for both the report date and the filename
+        now = datetime.now()
 
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = (
-            f"ce_broker_report_{user.full_name.replace(' ', '_')}_{timestamp}.pdf"
-        )
+        with _pdf_render_slot():
+            # Queried only once a slot is held, so a request turned away
+            # with 429 never runs it
+            records = _iter_ce_broker_records(db, user.id)
+            pdf = _render_ce_broker_pdf(
+                user, records, certificate_count, total_credits, now
+            )
+
+        filename = _report_filename(user, "pdf", now)
 
-        return StreamingResponse(
-            buffer,
+        # One body with a Content-Length; iterating the BytesIO would send
+        # it line by line
+        return Response(
+            content=pdf,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "ETag": etag,
+                "Cache-Control": _EXPORT_CACHE_CONTROL,
+            },
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF export failed: {str(e)}")
 
 
-async def generate_ce_broker_csv(data: list, user) -> StreamingResponse:
-    """Generate CSV file for CE Broker data"""
-    # Create CSV in memory
-    output = io.StringIO()
+# Rendering is CPU bound and runs in the request threadpool; cap how many
+# PDFs are built at once so a burst of exports can't take every worker
+PDF_RENDER_CONCURRENCY = max(1, (os.cpu_count() or 1) // 2)
+_pdf_render_slots = threading.BoundedSemaphore(PDF_RENDER_CONCURRENCY)
 
-    if not data:
-        writer = csv.writer(output)
-        writer.writerow(["No certificates found"])
-        output.seek(0)
 
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode("utf-8")),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=ce_broker_no_data.csv"
-            },
+@contextmanager
+def _pdf_render_slot():
+    """Hold one PDF rendering slot, or answer 429 if none is free"""
+    if not _pdf_render_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many PDF exports in progress, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    try:
+        yield
+    finally:
+        _pdf_render_slots.release()
+
+
+def _render_ce_broker_pdf(
+    user,
+    records: Iterable[dict],
+    certificate_count: int,
+    total_credits: float,
+    now: datetime,
+) -> bytes:
+    """Draw the CE Broker submission report for a user's records"""
+    # Create PDF using simple canvas approach
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # Title
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, "CE Broker Submission Report")
+
+    # User info
+    y = height - 100
+    text = p.beginText(50, y)
+    text.setFont("Helvetica", 12, leading=20)
+    text.textLines(
+        [
+            f"Name: {user.full_name or 'N/A'}",
+            f"Email: {user.email or 'N/A'}",
+            f"License: {user.license_number or 'N/A'}",
+            f"Jurisdiction: {user.primary_jurisdiction or 'N/A'}",
+            f"Report Date: {now.strftime('%m/%d/%Y')}",
+        ]
+    )
+    p.drawText(text)
+    y -= 80
+
+    # Summary
+    y -= 40
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Summary")
+    y -= 25
+    text = p.beginText(50, y)
+    text.setFont("Helvetica", 12, leading=20)
+    text.textLine(f"Total Certificates: {certificate_count}")
+    text.textLine(f"Total Credits: {total_credits:.1f}")
+    p.drawText(text)
+    y -= 20
+
+    # Certificate list header
+    y -= 40
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Certificates for CE Broker Submission")
+    y -= 30
+
+    # Instructions
+    text = p.beginText(50, y)
+    text.setFont("Helvetica", 10, leading=15)
+    text.textLines(_PDF_INSTRUCTION_LINES)
+    p.drawText(text)
+    y -= 60
+
+    # Certificate details - one text object (BT/ET block) per certificate
+    for i, ce_record in enumerate(records, 1):
+        # Check if we need a new page
+        if y < 100:
+            p.showPage()
+            y = height - 50
+
+        # Course name (might be long, so wrap it)
+        course_lines = textwrap.wrap(ce_record["course_name"], 80) or [""]
+        lines = [f"Course: {course_lines[0]}"]
+        lines.extend(f"        {line}" for line in course_lines[1:])
+        lines.extend(
+            [
+                f"Provider: {ce_record['provider_name']}",
+                f"Date: {ce_record['completion_date']}",
+                f"Credits: {ce_record['credits']:.1f}",
+                f"Subject Areas: {ce_record['subject_areas']}",
+                f"Course Code: {ce_record['course_code'] or 'N/A'}",
+                f"Certificate File: {ce_record['certificate_filename'] or 'N/A'}",
+            ]
         )
 
-    # Get field names from first record
-    fieldnames = list(data[0].keys())
-
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(data)
-
-    output.seek(0)
-
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"ce_broker_report_{user.full_name.replace(' ', '_')}_{timestamp}.csv"
-
+        text = p.beginText(50, y)
+        text.setFont("Helvetica-Bold", 11)
+        text.textOut(f"Certificate #{i}")
+        text.setTextOrigin(70, y - 20)
+        text.setFont("Helvetica", 10, leading=15)
+        text.textLines(lines)
+        p.drawText(text)
+
+        y -= 20 + 15 * (len(lines) - 1) + 25
+
+    # Save PDF
+    p.save()
+
+    return buffer.getvalue()
+
+
+# Fixed instruction lines printed above the certificate list in the PDF
+_PDF_INSTRUCTION_LINES = [
+    "Instructions: Copy the information below into CE Broker forms",
+    "Provider for all courses: Professional Education Services",
+    "Delivery Method for all: Computer-Based Training (ie: online courses)",
+]
+
+# Static submission instructions included in every JSON report
+_CE_BROKER_INSTRUCTIONS = get_ce_broker_instructions()
+
+# CSV column header -> key in format_ce_broker_record()
+CE_BROKER_CSV_COLUMNS = {
+    "Course Name": "course_name",
+    "Provider Name": "provider_name",
+    "Completion Date": "completion_date",
+    "Credits": "credits",
+    "Delivery Method": "delivery_method",
+    "Subject Areas": "subject_areas",
+    "Course Code": "course_code",
+    "Field of Study": "field_of_study",
+    "Certificate File": "certificate_filename",
+    "NASBA Sponsor": "nasba_sponsor",
+}
+_CSV_HEADERS = tuple(CE_BROKER_CSV_COLUMNS)
+
+# Pulls the CSV columns out of a CE Broker record as a tuple, in header order
+_to_csv_row = operator.itemgetter(*CE_BROKER_CSV_COLUMNS.values())
+
+# Encoded CSV is sent in chunks of roughly this many bytes
+CSV_CHUNK_SIZE = 64 * 1024
+
+
+_FILENAME_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def _report_filename(user, extension: str, now: Optional[datetime] = None) -> str:
+    timestamp = (now or datetime.now()).strftime(_FILENAME_TIMESTAMP_FORMAT)
+    name = user_filename_part(user.full_name)
+    return f"ce_broker_report_{name}_{timestamp}.{extension}"
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """Encode CSV rows incrementally, reusing one text buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def csv_streaming_response(
+    header: Sequence[str], rows: Iterable[Sequence], filename: str
+) -> StreamingResponse:
+    """Stream CSV rows as a file download"""
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode("utf-8")),
+        iter_csv(header, rows),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
+
+
+def generate_ce_broker_csv(data: Iterable[dict], user) -> StreamingResponse:
+    """Generate CSV file for CE Broker data"""
+    records = iter(data)
+    first_record = next(records, None)
+    if first_record is None:
+        return csv_streaming_response(
+            ["No certificates found"], [], "ce_broker_no_data.csv"
+        )
+
+    # Get field names from first record; every record has the same keys
+    fieldnames = tuple(first_record.keys())
+    if len(fieldnames) > 1:
+        to_row = operator.itemgetter(*fieldnames)
+    else:
+        # itemgetter with a single key returns the bare value, not a tuple
+        to_row = lambda record: tuple(record[field] for field in fieldnames)
+
+    return csv_streaming_response(
+        fieldnames,
+        map(to_row, itertools.chain([first_record], records)),
+        _report_filename(user, "csv"),
+    )
@@ -6,15 +6,27 @@ Handles data retrieval, updates, and management of certificate records.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy.orm import Session, load_only, raiseload
+from sqlalchemy import Text, cast, func, desc, asc, select, tuple_
 from typing import Optional, List
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+import base64
+import os
+import threading
+import time
+
+import orjson
 
 from ..core.database import get_db
 from ..models import CPERecord, User
 
 
+# The endpoints are plain (sync) functions: their SQLAlchemy calls block, so
+# FastAPI runs them in its threadpool instead of on the event loop
 router = APIRouter(
     prefix="/api/certificates",
     tags=["Certificate Data"],
@@ -22,16 +34,104 @@ router = APIRouter(
 )
 
 
+# With SUPERCPE_STRICT_ORM=1 (development/CI), relationship access on the
+# records loaded for /summary raises instead of quietly issuing a query per row
+_STRICT_LOAD_OPTIONS = (
+    (raiseload("*"),) if os.getenv("SUPERCPE_STRICT_ORM") == "1" else ()
+)
+
+
+# The default user's id is remembered for a few minutes, so most requests
+# resolve it with a primary-key lookup (or, via get_default_user_id, without
+# touching the database at all)
+DEFAULT_USER_CACHE_TTL_SECONDS = 300
+_default_user_cache = {"id": None, "expires_at": 0.0}
+
+
+def _cached_default_user_id() -> Optional[int]:
+    if _default_user_cache["expires_at"] > time.monotonic():
+        return _default_user_cache["id"]
+    return None
+
+
 def get_or_create_default_user(db: Session) -> User:
     """Get or create a default user for testing"""
-    # Try to get any existing user first
-    user = db.query(User).first()
+    user_id = _cached_default_user_id()
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user is not None:
+            return user
+
+    user = _load_or_create_default_user(db)
+    _default_user_cache["id"] = user.id
+    _default_user_cache["expires_at"] = (
+        time.monotonic() + DEFAULT_USER_CACHE_TTL_SECONDS
+    )
+    return user
+
+
+def get_default_user_id(db: Session) -> int:
+    """Id of the default user, for endpoints that only filter by it"""
+    user_id = _cached_default_user_id()
+    if user_id is None:
+        user_id = get_or_create_default_user(db).id
+    return user_id
+
+
+# Encoded /summary and /fields/available bodies, per (endpoint, user id).
+# Uploads drop a user's entries (invalidate_certificate_caches); the short
+# TTL bounds how stale another worker's copy can get.
+RESPONSE_CACHE_TTL_SECONDS = 30
+RESPONSE_CACHE_MAX_SIZE = 1024
+_response_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _cached_response(key: tuple) -> Optional[Response]:
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        body, expires_at = entry
+        if expires_at <= time.monotonic():
+            del _response_cache[key]
+            return None
+    return _json_response(body)
+
+
+def _cache_response(key: tuple, content: dict) -> Response:
+    # Same options as ORJSONResponse - field_of_study keys may be None
+    body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    with _response_cache_lock:
+        _response_cache[key] = (body, time.monotonic() + RESPONSE_CACHE_TTL_SECONDS)
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > RESPONSE_CACHE_MAX_SIZE:
+            _response_cache.popitem(last=False)
+    return _json_response(body)
+
+
+def invalidate_certificate_caches(user_id: int) -> None:
+    """Drop cached certificate summaries for a user after their records change"""
+    with _response_cache_lock:
+        _response_cache.pop(("summary", user_id), None)
+        _response_cache.pop(("fields", user_id), None)
+
+
+def _load_or_create_default_user(db: Session) -> User:
+    # Try to get any existing user first - the oldest, so every worker
+    # settles on the same one
+    user = db.query(User).order_by(User.id).first()
 
     if user:
         return user
 
     # Only create if no users exist at all
     try:
+        now = datetime.utcnow()
         user = User(
             email="default@test.com",
             full_name="Default Test User",
@@ -41,8 +141,8 @@ def get_or_create_default_user(db: Session) -> User:
             is_active=True,
             email_reminders=True,
             newsletter_subscription=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            created_at=now,
+            updated_at=now,
         )
         db.add(user)
         db.commit()
@@ -51,31 +151,28 @@ def get_or_create_default_user(db: Session) -> User:
     except Exception as e:
         db.rollback()
         # If creation fails, try to get any existing user
-        existing_user = db.query(User).first()
+        existing_user = db.query(User).order_by(User.id).first()
         if existing_user:
             return existing_user
         raise e
 
 
 @router.get("/summary")
-async def get_certificates_summary(db: Session = Depends(get_db)):
+def get_certificates_summary(db: Session = Depends(get_db)):
     """Get summary of saved certificates from database"""
     try:
+        cached = _cached_response(("summary", get_default_user_id(db)))
+        if cached is not None:
+            return cached
+
         # Get existing user
         user = get_or_create_default_user(db)
 
-        # Get total counts and credits for this user
         user_records = db.query(CPERecord).filter(CPERecord.user_id == user.id)
 
-        total_count = user_records.count()
-        total_credits = (
-            db.query(func.sum(CPERecord.cpe_credits))
-            .filter(CPERecord.user_id == user.id)
-            .scalar()
-            or 0
-        )
-
-        # Group by field of study
+        # Group by field of study - credits summed in SQL as exact NUMERIC;
+        # the overall totals are just the sum of the groups, converted to
+        # float once at the end
         field_summary = (
             db.query(
                 CPERecord.field_of_study,
@@ -86,13 +183,30 @@ async def get_certificates_summary(db: Session = Depends(get_db)):
             .group_by(CPERecord.field_of_study)
             .all()
         )
+        total_count = sum(item.course_count for item in field_summary)
+        total_credits = float(
+            sum((item.total_credits for item in field_summary), Decimal(0))
+        )
 
         # Recent certificates
         recent_certs = (
-            user_records.order_by(CPERecord.extracted_at.desc()).limit(5).all()
+            user_records.options(
+                # Only the columns returned below
+                load_only(
+                    CPERecord.id,
+                    CPERecord.course_name,
+                    CPERecord.cpe_credits,
+                    CPERecord.completion_date,
+                    CPERecord.field_of_study,
+                ),
+                *_STRICT_LOAD_OPTIONS,
+            )
+            .order_by(CPERecord.extracted_at.desc())
+            .limit(5)
+            .all()
         )
 
-        return {
+        summary = {
             "user_info": {
                 "id": user.id,
                 "name": user.full_name,
@@ -102,7 +216,7 @@ async def get_certificates_summary(db: Session = Depends(get_db)):
             },
             "totals": {
                 "total_certificates": total_count,
-                "total_credits": float(total_credits),
+                "total_credits": total_credits,
             },
             "by_field_of_study": {
                 item.field_of_study: {
@@ -116,94 +230,163 @@ async def get_certificates_summary(db: Session = Depends(get_db)):
                     "id": cert.id,
                     "course_name": cert.course_name,
                     "credits": float(cert.cpe_credits),
-                    "completion_date": (
-                        cert.completion_date.isoformat()
-                        if cert.completion_date
-                        else None
-                    ),
+                    "completion_date": cert.completion_date,
                     "field_of_study": cert.field_of_study,
                 }
                 for cert in recent_certs
             ],
             "note": f"Using existing default user (ID: {user.id})",
         }
+        return _cache_response(("summary", user.id), summary)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 
+# The CPERecord columns /list and /{certificate_id} return; only these are
+# loaded, rather than whole rows
+_LIST_COLUMNS = (
+    CPERecord.id,
+    CPERecord.course_name,
+    CPERecord.course_code,
+    CPERecord.provider_name,
+    CPERecord.field_of_study,
+    CPERecord.cpe_credits,
+    CPERecord.completion_date,
+    CPERecord.certificate_filename,
+    CPERecord.extracted_at,
+    CPERecord.delivery_method,
+    CPERecord.nasba_sponsor_id,
+)
+# Each /list row as a JSON object text, built by Postgres with the same keys
+# and order as _LIST_COLUMNS (numbers stay numbers, dates come out ISO)
+_LIST_ROW_JSON = cast(
+    func.json_build_object(
+        *chain.from_iterable((column.key, column) for column in _LIST_COLUMNS)
+    ),
+    Text,
+).label("certificate_json")
+_DETAIL_COLUMNS = _LIST_COLUMNS + (
+    CPERecord.certificate_hash,
+    CPERecord.extraction_confidence,
+)
+
+# Sort fields for /list. The NOT NULL ones can be paged with a keyset cursor
+# on (value, id), backed by the (user_id, column, id) indexes; the nullable
+# ones only support skip/limit.
+_KEYSET_SORT_FIELDS = {
+    "completion_date": date.fromisoformat,
+    "course_name": str,
+    "cpe_credits": Decimal,
+}
+_OFFSET_SORT_FIELDS = {"extracted_at", "field_of_study"}
+
+
+def _encode_list_cursor(sort_value, record_id: int) -> str:
+    payload = orjson.dumps([str(sort_value), record_id])
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _decode_list_cursor(cursor: str, sort_by: str):
+    """(sort value, id) from a /list cursor, or a 400 if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_value, record_id = orjson.loads(base64.urlsafe_b64decode(padded))
+        return _KEYSET_SORT_FIELDS[sort_by](raw_value), int(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
 @router.get("/list")
-async def list_certificates(
+def list_certificates(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page (replaces skip)"
+    ),
     field_of_study: Optional[str] = Query(None, description="Filter by field of study"),
     sort_by: str = Query("completion_date", description="Sort by field"),
     sort_order: str = Query("desc", description="Sort order (asc/desc)"),
 ):
-    """List certificates with filtering, sorting, and pagination"""
+    """List certificates with filtering, sorting, and pagination
+
+    Pages are fetched by keyset: pass the returned ``next_cursor`` to get the
+    following page, which costs the same however deep it is. ``skip`` still
+    works, and is the only option when sorting by a nullable field.
+    """
     try:
-        user = get_or_create_default_user(db)
+        user_id = get_default_user_id(db)
 
-        # Build query
-        query = db.query(CPERecord).filter(CPERecord.user_id == user.id)
+        if sort_by not in _KEYSET_SORT_FIELDS and sort_by not in _OFFSET_SORT_FIELDS:
+            sort_by = "completion_date"
+        keyset = sort_by in _KEYSET_SORT_FIELDS
+        ascending = sort_order.lower() == "asc"
+        direction = asc if ascending else desc
+        sort_column = getattr(CPERecord, sort_by)
+
+        # Build query - each row is the certificate's JSON, plus the sort
+        # value and id for the next cursor
+        query = db.query(_LIST_ROW_JSON, sort_column, CPERecord.id).filter(
+            CPERecord.user_id == user_id
+        )
 
         # Apply filters
         if field_of_study:
             query = query.filter(CPERecord.field_of_study == field_of_study)
 
-        # Apply sorting
-        valid_sort_fields = [
-            "completion_date",
-            "extracted_at",
-            "course_name",
-            "cpe_credits",
-            "field_of_study",
-        ]
-        if sort_by not in valid_sort_fields:
-            sort_by = "completion_date"
+        # Apply sorting - id breaks ties so the order (and cursors) are stable
+        query = query.order_by(direction(sort_column), direction(CPERecord.id))
 
-        sort_column = getattr(CPERecord, sort_by)
-        if sort_order.lower() == "asc":
-            query = query.order_by(asc(sort_column))
+        # The total is only counted for skip/limit paging; it needs a scan of
+        # every matching row, which cursor pages avoid
+        total_count = None
+        if cursor is not None and keyset:
+            last_value, last_id = _decode_list_cursor(cursor, sort_by)
+            position = tuple_(sort_column, CPERecord.id)
+            bound = tuple_(last_value, last_id)
+            query = query.filter(position > bound if ascending else position < bound)
+
+            # One extra row tells us whether there is another page
+            certificates = query.limit(limit + 1).all()
         else:
-            query = query.order_by(desc(sort_column))
-
-        # Get total count before pagination
-        total_count = query.count()
-
-        # Apply pagination
-        certificates = query.offset(skip).limit(limit).all()
-
-        # Format response
-        certificate_list = [
-            {
-                "id": cert.id,
-                "course_name": cert.course_name,
-                "course_code": cert.course_code,
-                "provider_name": cert.provider_name,
-                "field_of_study": cert.field_of_study,
-                "cpe_credits": float(cert.cpe_credits),
-                "completion_date": (
-                    cert.completion_date.isoformat() if cert.completion_date else None
-                ),
-                "certificate_filename": cert.certificate_filename,
-                "extracted_at": (
-                    cert.extracted_at.isoformat() if cert.extracted_at else None
-                ),
-                "delivery_method": cert.delivery_method,
-                "nasba_sponsor_id": cert.nasba_sponsor_id,
-            }
-            for cert in certificates
-        ]
+            # COUNT(*) OVER () is computed before OFFSET/LIMIT, so every row
+            # of the page carries the total - no separate count query
+            rows = (
+                query.add_columns(func.count().over().label("total_count"))
+                .offset(skip)
+                .limit(limit + 1)
+                .all()
+            )
+            certificates = [row[:3] for row in rows]
+            if rows:
+                total_count = rows[0].total_count
+            else:
+                # Past the last page (or nothing at all) - count directly
+                total_count = query.count() if skip else 0
+
+        has_more = len(certificates) > limit
+        del certificates[limit:]
+
+        next_cursor = None
+        if has_more and keyset:
+            _, last_value, last_id = certificates[-1]
+            next_cursor = _encode_list_cursor(last_value, last_id)
+
+        # The certificates are already JSON - orjson splices them in as-is
+        # rather than building and re-encoding a dict per row
+        certificate_list = orjson.Fragment(
+            "[" + ",".join(row[0] for row in certificates) + "]"
+        )
 
-        return {
+        page = {
             "status": "success",
             "pagination": {
                 "total_count": total_count,
-                "skip": skip,
+                "skip": skip if cursor is None or not keyset else None,
                 "limit": limit,
-                "has_more": (skip + limit) < total_count,
+                "has_more": has_more,
+                "next_cursor": next_cursor,
             },
             "filters": {
                 "field_of_study": field_of_study,
@@ -212,7 +395,11 @@ async def list_certificates(
             },
             "certificates": certificate_list,
         }
+        # Serialized straight by orjson, skipping FastAPI's jsonable_encoder
+        return ORJSONResponse(page)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to list certificates: {str(e)}"
@@ -220,24 +407,24 @@ async def list_certificates(
 
 
 @router.get("/{certificate_id}")
-async def get_certificate_detail(
+def get_certificate_detail(
     certificate_id: int,
     db: Session = Depends(get_db),
 ):
     """Get detailed information for a specific certificate"""
     try:
-        user = get_or_create_default_user(db)
+        user_id = get_default_user_id(db)
 
-        certificate = (
-            db.query(CPERecord)
-            .filter(CPERecord.id == certificate_id, CPERecord.user_id == user.id)
-            .first()
-        )
+        certificate = db.execute(
+            select(*_DETAIL_COLUMNS).where(
+                CPERecord.id == certificate_id, CPERecord.user_id == user_id
+            )
+        ).first()
 
         if not certificate:
             raise HTTPException(status_code=404, detail="Certificate not found")
 
-        return {
+        detail = {
             "status": "success",
             "certificate": {
                 "id": certificate.id,
@@ -246,28 +433,17 @@ async def get_certificate_detail(
                 "provider_name": certificate.provider_name,
                 "field_of_study": certificate.field_of_study,
                 "cpe_credits": float(certificate.cpe_credits),
-                "completion_date": (
-                    certificate.completion_date.isoformat()
-                    if certificate.completion_date
-                    else None
-                ),
+                "completion_date": certificate.completion_date,
                 "certificate_filename": certificate.certificate_filename,
                 "certificate_hash": certificate.certificate_hash,
                 "delivery_method": certificate.delivery_method,
                 "nasba_sponsor_id": certificate.nasba_sponsor_id,
                 "extraction_confidence": certificate.extraction_confidence,
-                "extracted_at": (
-                    certificate.extracted_at.isoformat()
-                    if certificate.extracted_at
-                    else None
-                ),
-                "created_at": (
-                    certificate.created_at.isoformat()
-                    if hasattr(certificate, "created_at") and certificate.created_at
-                    else None
-                ),
+                "extracted_at": certificate.extracted_at,
+                "created_at": getattr(certificate, "created_at", None),
             },
         }
+        return ORJSONResponse(detail)
 
     except HTTPException:
         raise
@@ -278,41 +454,30 @@ async def get_certificate_detail(
 
 
 @router.get("/fields/available")
-async def get_available_fields(db: Session = Depends(get_db)):
+def get_available_fields(db: Session = Depends(get_db)):
     """Get list of available field values for filtering"""
     try:
-        user = get_or_create_default_user(db)
-
-        # Get unique field of study values
-        fields_of_study = (
-            db.query(CPERecord.field_of_study)
-            .filter(CPERecord.user_id == user.id)
-            .distinct()
-            .all()
-        )
-
-        # Get unique providers
-        providers = (
-            db.query(CPERecord.provider_name)
-            .filter(CPERecord.user_id == user.id)
-            .distinct()
-            .all()
-        )
-
-        # Get delivery methods
-        delivery_methods = (
-            db.query(CPERecord.delivery_method)
-            .filter(CPERecord.user_id == user.id)
-            .distinct()
-            .all()
-        )
-
-        return {
+        user_id = get_default_user_id(db)
+        cached = _cached_response(("fields", user_id))
+        if cached is not None:
+            return cached
+
+        # Distinct field of study, provider and delivery method values, all
+        # from one pass over the user's records (NULL when there are none)
+        fields_of_study, providers, delivery_methods = db.execute(
+            select(
+                func.array_agg(CPERecord.field_of_study.distinct()),
+                func.array_agg(CPERecord.provider_name.distinct()),
+                func.array_agg(CPERecord.delivery_method.distinct()),
+            ).where(CPERecord.user_id == user_id)
+        ).one()
+
+        available = {
             "status": "success",
             "available_filters": {
-                "fields_of_study": [item[0] for item in fields_of_study if item[0]],
-                "providers": [item[0] for item in providers if item[0]],
-                "delivery_methods": [item[0] for item in delivery_methods if item[0]],
+                "fields_of_study": [item for item in fields_of_study or () if item],
+                "providers": [item for item in providers or () if item],
+                "delivery_methods": [item for item in delivery_methods or () if item],
             },
             "sortable_fields": [
                 "completion_date",
@@ -322,6 +487,7 @@ async def get_available_fields(db: Session = Depends(get_db)):
                 "field_of_study",
             ],
         }
+        return _cache_response(("fields", user_id), available)
 
     except Exception as e:
         raise HTTPException(
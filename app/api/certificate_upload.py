@@ -5,15 +5,21 @@ Handles single and bulk certificate uploads with basic text extraction
 """
 
 from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Union
 from datetime import datetime, date
+import asyncio
 import hashlib
 import re
 
 # FIXED: Use relative import to avoid circular dependency
 from ..models import CPERecord, User
 from ..core.database import get_db
+from .certificate_data import get_or_create_default_user, invalidate_certificate_caches
 
 router = APIRouter(
     prefix="/api/certificates",
@@ -31,6 +37,31 @@ def generate_file_hash(file_content: bytes) -> str:
     return hashlib.sha256(file_content).hexdigest()
 
 
+UPLOAD_READ_CHUNK_SIZE = 1 << 20
+
+# Extraction runs in the request threadpool; cap how many files are extracted
+# at once so a large bulk upload can't take every worker thread from the
+# other (sync) endpoints and the password hashing calls
+EXTRACTION_CONCURRENCY = 6
+_extraction_slots = asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+
+
+async def hash_upload(file: UploadFile) -> tuple[str, int]:
+    """SHA256 hash and size of an upload, read in chunks
+
+    Only one chunk is held in memory at a time, so a duplicate can be
+    rejected without ever loading the whole file. The upload is rewound
+    afterwards for a full read.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
 def validate_file_type(filename: str) -> tuple[bool, str]:
     """Validate if file type is supported"""
     if not filename or "." not in filename:
@@ -45,14 +76,19 @@ def validate_file_type(filename: str) -> tuple[bool, str]:
 def extract_basic_text(file_content: bytes, filename: str) -> str:
     """Extract text using Google Cloud Vision for all file types"""
     try:
-        from app.services.vision_service import VisionService
+        from app.services.vision_service import get_vision_service
 
-        vision = VisionService()
-        return vision.extract_text(file_content, filename)
+        return get_vision_service().extract_text(file_content, filename)
     except Exception as e:
         return f"Vision extraction failed: {str(e)}"
 
 
+def extract_certificate_data(file_content: bytes, filename: str) -> dict:
+    """Extract text from a certificate file and parse its fields"""
+    extracted_text = extract_basic_text(file_content, filename)
+    return parse_certificate_data(extracted_text, filename)
+
+
 def parse_date_properly(date_str: str) -> date:
     """Parse various date formats properly - FIXED VERSION"""
     if not date_str:
@@ -80,6 +116,63 @@ def parse_date_properly(date_str: str) -> date:
     return None
 
 
+# Certificate text patterns, compiled once at import rather than looked up in
+# re's cache for every field of every certificate
+_PROVIDER_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    for pattern in (
+        r"^([A-Za-z\s&.,-]+)(?:\n|$)",
+        r"(MasterCPE|NASBA|CPE\s*Central|Becker|Wiley|Thomson Reuters|CCH)",
+        r"([A-Za-z\s&.,-]+)\s*(?:Professional|Education|Training|Institute|Academy)",
+    )
+]
+_PROVIDER_STRIP_RE = re.compile(r"[^\w\s&.,-]")
+
+_COURSE_NAME_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r"for\s+successfully\s+completing\s*[\n\r]*\s*([^\n\r]+)",
+        r"completion\s+of\s*[\n\r]*\s*([^\n\r]+)",
+        r"(?:subject|course|title)\s*:?\s*[\n\r]*\s*([^\n\r]+)",
+        r"certificate\s+of\s+completion\s*[\n\r]+(?:[^\n\r]*[\n\r]+)*?\s*([^\n\r]+)",
+        r"(?:awarded\s+to\s+[^\n\r]+\s*[\n\r]+\s*(?:for\s+)?(?:successfully\s+)?(?:completing\s+)?)\s*([^\n\r]+)",
+    )
+]
+_EDGE_PUNCTUATION_RE = re.compile(r"^\W+|\W+$")
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+_CODE_LIKE_RE = re.compile(r"^[A-Z]\d+")
+
+_COURSE_CODE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"course\s+code\s*:?\s*([A-Z]\d+[-\w]*)",
+        r"(?:code|id)\s*:?\s*([A-Z]\d+[-\w]*)",
+        r"\b([A-Z]\d{2,5}[-\w]*)\b",
+    )
+]
+
+_CREDIT_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"(\d+\.?\d*)\s*(?:cpe\s*)?(?:hours?|credits?)",
+        r"(?:hours?|credits?)\s*:?\s*(\d+\.?\d*)",
+        r"(\d+\.?\d*)\s*continuing\s+professional\s+education",
+        r"total\s*:?\s*(\d+\.?\d*)\s*(?:hours?|credits?)",
+    )
+]
+
+_DATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"Date\s*:?\s*([A-Za-z]+,?\s+[A-Za-z]+\s+\d{1,2},?\s+\d{4})",
+        r"Date\s*:?\s*([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
+        r"Date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+        r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
+        r"([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
+    )
+]
+
+
 def parse_certificate_data(text: str, filename: str) -> dict:
     """Enhanced certificate data parser with better pattern recognition"""
     # Initialize with defaults
@@ -98,22 +191,13 @@ def parse_certificate_data(text: str, filename: str) -> dict:
     if not text or len(text) < 10:
         return data
 
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    text_lower = text.lower()
-
     # =================
     # PROVIDER EXTRACTION
     # =================
-    provider_patterns = [
-        r"^([A-Za-z\s&.,-]+)(?:\n|$)",
-        r"(MasterCPE|NASBA|CPE\s*Central|Becker|Wiley|Thomson Reuters|CCH)",
-        r"([A-Za-z\s&.,-]+)\s*(?:Professional|Education|Training|Institute|Academy)",
-    ]
-
-    for pattern in provider_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    for pattern in _PROVIDER_PATTERNS:
+        match = pattern.search(text)
         if match and len(match.group(1).strip()) > 3:
-            provider = re.sub(r"[^\w\s&.,-]", "", match.group(1).strip())
+            provider = _PROVIDER_STRIP_RE.sub("", match.group(1).strip())
             if provider and provider.lower() not in [
                 "certificate",
                 "completion",
@@ -125,20 +209,12 @@ def parse_certificate_data(text: str, filename: str) -> dict:
     # =================
     # COURSE NAME EXTRACTION
     # =================
-    course_name_patterns = [
-        r"for\s+successfully\s+completing\s*[\n\r]*\s*([^\n\r]+)",
-        r"completion\s+of\s*[\n\r]*\s*([^\n\r]+)",
-        r"(?:subject|course|title)\s*:?\s*[\n\r]*\s*([^\n\r]+)",
-        r"certificate\s+of\s+completion\s*[\n\r]+(?:[^\n\r]*[\n\r]+)*?\s*([^\n\r]+)",
-        r"(?:awarded\s+to\s+[^\n\r]+\s*[\n\r]+\s*(?:for\s+)?(?:successfully\s+)?(?:completing\s+)?)\s*([^\n\r]+)",
-    ]
-
-    for pattern in course_name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    for pattern in _COURSE_NAME_PATTERNS:
+        match = pattern.search(text)
         if match:
             course_name = match.group(1).strip()
-            course_name = re.sub(r"^\W+|\W+$", "", course_name)
-            course_name = re.sub(r"\s+", " ", course_name)
+            course_name = _EDGE_PUNCTUATION_RE.sub("", course_name)
+            course_name = _WHITESPACE_RUN_RE.sub(" ", course_name)
 
             if (
                 len(course_name) > 5
@@ -150,7 +226,7 @@ def parse_certificate_data(text: str, filename: str) -> dict:
                     "daniel ahern",
                     "elizabeth kolar",
                 ]
-                and not re.match(r"^[A-Z]\d+", course_name)
+                and not _CODE_LIKE_RE.match(course_name)
             ):
                 data["course_name"] = course_name
                 break
@@ -158,14 +234,8 @@ def parse_certificate_data(text: str, filename: str) -> dict:
     # =================
     # COURSE CODE EXTRACTION
     # =================
-    course_code_patterns = [
-        r"course\s+code\s*:?\s*([A-Z]\d+[-\w]*)",
-        r"(?:code|id)\s*:?\s*([A-Z]\d+[-\w]*)",
-        r"\b([A-Z]\d{2,5}[-\w]*)\b",
-    ]
-
-    for pattern in course_code_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _COURSE_CODE_PATTERNS:
+        match = pattern.search(text)
         if match:
             data["course_code"] = match.group(1)
             break
@@ -173,15 +243,8 @@ def parse_certificate_data(text: str, filename: str) -> dict:
     # =================
     # CPE CREDITS EXTRACTION
     # =================
-    credit_patterns = [
-        r"(\d+\.?\d*)\s*(?:cpe\s*)?(?:hours?|credits?)",
-        r"(?:hours?|credits?)\s*:?\s*(\d+\.?\d*)",
-        r"(\d+\.?\d*)\s*continuing\s+professional\s+education",
-        r"total\s*:?\s*(\d+\.?\d*)\s*(?:hours?|credits?)",
-    ]
-
-    for pattern in credit_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _CREDIT_PATTERNS:
+        match = pattern.search(text)
         if match:
             try:
                 credits = float(match.group(1))
@@ -194,18 +257,10 @@ def parse_certificate_data(text: str, filename: str) -> dict:
     # =================
     # DATE EXTRACTION - FIXED
     # =================
-    date_patterns = [
-        r"Date\s*:?\s*([A-Za-z]+,?\s+[A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-        r"Date\s*:?\s*([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-        r"Date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-        r"(\d{1,2}[/-]\d{1,2}[/-]\d{4})",
-        r"([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-    ]
-
-    for pattern in date_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for date_str in matches:
-            parsed_date = parse_date_properly(date_str.strip())
+    # finditer rather than findall: the scan stops at the first usable date
+    for pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            parsed_date = parse_date_properly(match.group(1).strip())
             if parsed_date and date(2020, 1, 1) <= parsed_date <= date.today():
                 data["completion_date"] = parsed_date
                 break
@@ -240,26 +295,8 @@ def parse_certificate_data(text: str, filename: str) -> dict:
 
 async def get_current_user_for_upload(db: Session = Depends(get_db)):
     """Temporary auth function - will be replaced with proper JWT auth"""
-    # For now, get or create a default user
-    user = db.query(User).first()
-    if not user:
-        # Create a default user for testing
-        user = User(
-            email="default@test.com",
-            full_name="Default User",
-            password_hash="dummy_hash",
-            primary_jurisdiction="NH",
-            onboarding_step="complete",
-            is_active=True,
-            email_reminders=True,
-            newsletter_subscription=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    return user
+    # For now, the same cached default user the certificate data endpoints use
+    return get_or_create_default_user(db)
 
 
 def validate_extracted_data(data: dict) -> list:
@@ -360,6 +397,91 @@ def generate_manual_entry_form(extracted_data: dict, quality_issues: list) -> di
     }
 
 
+def _cpe_record_row(
+    user_id: int, parsed_data: dict, filename: str, file_hash: str
+) -> dict:
+    """Column values for a CPE record auto-processed from an upload"""
+    return {
+        "user_id": user_id,
+        "course_name": parsed_data["course_name"],
+        "course_code": parsed_data["course_code"],
+        "provider_name": parsed_data["provider_name"],
+        "field_of_study": parsed_data["field_of_study"],
+        "cpe_credits": parsed_data["cpe_credits"],
+        "delivery_method": parsed_data["delivery_method"],
+        "completion_date": parsed_data["completion_date"],
+        "is_ethics": parsed_data["is_ethics"],
+        "original_filename": filename,  # NEW
+        "certificate_filename": filename,
+        "certificate_hash": file_hash,
+        "is_stored": False,  # NEW
+        "storage_tier": "free",  # NEW
+        "nasba_sponsor_id": "112530",
+        "extracted_at": datetime.utcnow(),
+        "extraction_confidence": 0.8,
+        "manually_verified": False,
+        "ce_broker_submitted": False,
+    }
+
+
+def _existing_records(db: Session, user_id: int, hashes) -> Dict[str, tuple]:
+    """(record id, credits) of the user's records with any of these hashes"""
+    return {
+        certificate_hash: (record_id, float(credits))
+        for certificate_hash, record_id, credits in db.execute(
+            select(
+                CPERecord.certificate_hash,
+                CPERecord.id,
+                CPERecord.cpe_credits,
+            ).where(
+                CPERecord.user_id == user_id,
+                CPERecord.certificate_hash.in_(hashes),
+            )
+        )
+    }
+
+
+def _insert_cpe_records(
+    db: Session, rows: List[dict]
+) -> Dict[str, Union[int, Exception]]:
+    """Insert new CPE records, mapping each certificate hash to its record id
+
+    All rows go in as one multi-row INSERT ... RETURNING. A row whose
+    (user_id, certificate_hash) was stored by a concurrent upload since the
+    duplicate check is skipped by ON CONFLICT DO NOTHING, and its hash is
+    left out of the result. If the database rejects the batch, the rows are
+    retried one at a time, each in its own SAVEPOINT, so a bad record fails
+    alone and its hash maps to the error.
+    """
+    if not rows:
+        return {}
+
+    statement = (
+        pg_insert(CPERecord)
+        .on_conflict_do_nothing(
+            index_elements=[CPERecord.user_id, CPERecord.certificate_hash]
+        )
+        .returning(CPERecord.certificate_hash, CPERecord.id)
+    )
+    try:
+        with db.begin_nested():
+            return dict(db.execute(statement, rows).all())
+    except SQLAlchemyError:
+        pass
+
+    inserted = {}
+    for row in rows:
+        try:
+            with db.begin_nested():
+                inserted_row = db.execute(statement, row).first()
+        except SQLAlchemyError as e:
+            inserted[row["certificate_hash"]] = e
+            continue
+        if inserted_row is not None:
+            inserted[row["certificate_hash"]] = inserted_row.id
+    return inserted
+
+
 # ADD THIS NEW ENHANCED ENDPOINT
 @router.post("/upload")
 async def upload_certificate_enhanced(
@@ -384,9 +506,9 @@ async def upload_certificate_enhanced(
                 "filename": file.filename,
             }
 
-        # Read file content
-        file_content = await file.read()
-        if len(file_content) == 0:
+        # Hash the file for duplicate detection, without loading it yet
+        file_hash, file_size = await hash_upload(file)
+        if file_size == 0:
             return {
                 "status": "empty_file",
                 "manual_entry_required": True,
@@ -395,30 +517,33 @@ async def upload_certificate_enhanced(
                 "filename": file.filename,
             }
 
-        # Generate file hash for duplicate detection
-        file_hash = generate_file_hash(file_content)
-
-        # Check for duplicates
-        existing_record = (
-            db.query(CPERecord)
-            .filter(
+        # Check for duplicates before any extraction work - only the id is
+        # needed
+        existing_record_id = db.execute(
+            select(CPERecord.id)
+            .where(
                 CPERecord.certificate_hash == file_hash,
                 CPERecord.user_id == current_user.id,
             )
-            .first()
-        )
+            .limit(1)
+        ).scalar()
 
-        if existing_record:
+        if existing_record_id is not None:
             return {
                 "status": "duplicate",
                 "message": "Certificate already exists in database",
-                "existing_record_id": existing_record.id,
+                "existing_record_id": existing_record_id,
                 "filename": file.filename,
             }
 
-        # Extract text from certificate
+        # Extract text from certificate - in the threadpool, like the bulk
+        # path, so OCR doesn't block the event loop
         try:
-            extracted_text = extract_basic_text(file_content, file.filename)
+            async with _extraction_slots:
+                file_content = await file.read()
+                extracted_text = await run_in_threadpool(
+                    extract_basic_text, file_content, file.filename
+                )
             if not extracted_text or len(extracted_text) < 10:
                 return {
                     "status": "extraction_failed",
@@ -460,45 +585,47 @@ async def upload_certificate_enhanced(
                 "filename": file.filename,
             }
         else:
-            # Auto-processing succeeded - save to database
-            cpe_record = CPERecord(
-                user_id=current_user.id,
-                course_name=parsed_data["course_name"],
-                course_code=parsed_data["course_code"],
-                provider_name=parsed_data["provider_name"],
-                field_of_study=parsed_data["field_of_study"],
-                cpe_credits=parsed_data["cpe_credits"],
-                delivery_method=parsed_data["delivery_method"],
-                completion_date=parsed_data["completion_date"],
-                is_ethics=parsed_data["is_ethics"],
-                original_filename=file.filename,
-                certificate_filename=file.filename,
-                certificate_hash=file_hash,
-                is_stored=False,
-                storage_tier="free",
-                nasba_sponsor_id="112530",
-                extracted_at=datetime.utcnow(),
-                extraction_confidence=0.8,
-                manually_verified=False,
-                ce_broker_submitted=False,
+            # Auto-processing succeeded - save to database. The INSERT ...
+            # RETURNING gives us the id; the response is built from the
+            # parsed values, so the record never needs loading.
+            inserted = _insert_cpe_records(
+                db,
+                [
+                    _cpe_record_row(
+                        current_user.id, parsed_data, file.filename, file_hash
+                    )
+                ],
             )
-
-            db.add(cpe_record)
+            record_id = inserted.get(file_hash)
+            if isinstance(record_id, Exception):
+                raise record_id
+            if record_id is None:
+                # A concurrent upload of the same file got there first
+                existing_id, _ = _existing_records(
+                    db, current_user.id, [file_hash]
+                )[file_hash]
+                return {
+                    "status": "duplicate",
+                    "message": "Certificate already exists in database",
+                    "existing_record_id": existing_id,
+                    "filename": file.filename,
+                }
             db.commit()
-            db.refresh(cpe_record)
+            invalidate_certificate_caches(current_user.id)
 
             return {
                 "status": "success",
                 "message": "Certificate processed automatically",
-                "record_id": cpe_record.id,
+                "record_id": record_id,
                 "manual_entry_required": False,
                 "extracted_data": {
-                    "course_name": cpe_record.course_name,
-                    "provider_name": cpe_record.provider_name,
-                    "cpe_credits": float(cpe_record.cpe_credits),
-                    "completion_date": cpe_record.completion_date.isoformat(),
-                    "field_of_study": cpe_record.field_of_study,
-                    "is_ethics": cpe_record.is_ethics,
+                    "course_name": parsed_data["course_name"],
+                    "provider_name": parsed_data["provider_name"],
+                    # As stored in the DECIMAL(5, 2) column
+                    "cpe_credits": round(float(parsed_data["cpe_credits"]), 2),
+                    "completion_date": parsed_data["completion_date"].isoformat(),
+                    "field_of_study": parsed_data["field_of_study"],
+                    "is_ethics": parsed_data["is_ethics"],
                 },
             }
 
@@ -551,13 +678,15 @@ async def submit_manual_entry(
     )
 
     db.add(cpe_record)
+    db.flush()
+    record_id = cpe_record.id
     db.commit()
-    db.refresh(cpe_record)
+    invalidate_certificate_caches(current_user.id)
 
     return {
         "status": "success",
         "message": "Manual entry saved successfully",
-        "record_id": cpe_record.id,
+        "record_id": record_id,
     }
 
 
@@ -570,110 +699,177 @@ async def bulk_upload_certificates(
     """Upload and process multiple CPE certificates"""
     user = current_user
 
-    results = []
+    # One result per file, in upload order - clients pair them by position
+    results = [None] * len(files)
     total_credits = 0.0
     saved_count = 0
     duplicate_count = 0
     error_count = 0
 
-    for file in files:
-        try:
-            # Validate file type
-            is_valid, file_ext = validate_file_type(file.filename)
-            if not is_valid:
-                results.append(
-                    {
-                        "original_filename": file.filename,
-                        "status": "failed",
-                        "error": f"Unsupported file type: {file_ext}",
-                    }
-                )
-                error_count += 1
-                continue
+    # Pass 1: validate every file, then hash the valid ones
+    valid_files = []  # (position, file)
+    for index, file in enumerate(files):
+        # Validate file type
+        is_valid, file_ext = validate_file_type(file.filename)
+        if not is_valid:
+            results[index] = {
+                "original_filename": file.filename,
+                "status": "failed",
+                "error": f"Unsupported file type: {file_ext}",
+            }
+            error_count += 1
+            continue
+        valid_files.append((index, file))
+
+    # Hash the uploads in chunks - duplicates are never read into memory
+    # whole. Uploads spooled to disk are read in the threadpool, so the reads
+    # overlap instead of waiting on each other.
+    hashed = await asyncio.gather(
+        *(hash_upload(file) for _, file in valid_files), return_exceptions=True
+    )
+
+    uploads = []  # (position, file, hash) for the files that passed validation
+    for (index, file), hash_result in zip(valid_files, hashed):
+        if isinstance(hash_result, Exception):
+            results[index] = {
+                "original_filename": file.filename,
+                "status": "failed",
+                "error": str(hash_result),
+            }
+            error_count += 1
+            continue
+        file_hash, _ = hash_result
+        uploads.append((index, file, file_hash))
+
+    # One query finds every file this user has already uploaded
+    existing_records = {}  # certificate hash -> (record id, credits)
+    if uploads:
+        existing_records = _existing_records(
+            db, user.id, {file_hash for _, _, file_hash in uploads}
+        )
 
-            # Read and process file
+    # Extract and parse the new files concurrently in the threadpool, at most
+    # EXTRACTION_CONCURRENCY at a time - OCR dominates and each file is
+    # independent. A file repeated in the batch is only extracted once, and
+    # only new files are read in full.
+    new_uploads = {}  # hash -> file
+    for _, file, file_hash in uploads:
+        if file_hash not in existing_records:
+            new_uploads.setdefault(file_hash, file)
+
+    async def read_and_extract(file: UploadFile) -> dict:
+        # Read inside the slot too, so only EXTRACTION_CONCURRENCY files'
+        # bytes are held in memory at a time
+        async with _extraction_slots:
             file_content = await file.read()
-            file_hash = generate_file_hash(file_content)
-
-            # Check for duplicates
-            existing_record = (
-                db.query(CPERecord)
-                .filter(
-                    CPERecord.certificate_hash == file_hash,
-                    CPERecord.user_id == user.id,
-                )
-                .first()
+            return await run_in_threadpool(
+                extract_certificate_data, file_content, file.filename
             )
 
+    parsed_results = await asyncio.gather(
+        *(read_and_extract(file) for file in new_uploads.values()),
+        return_exceptions=True,
+    )
+    parsed_by_hash = dict(zip(new_uploads, parsed_results))
+
+    # Pass 2: build a row for each new file, in upload order. Results for
+    # new records get their ids once the rows are inserted.
+    new_rows = {}  # hash -> CPERecord column values
+    pending_results = []  # (result, hash) waiting on a record id
+    for index, file, file_hash in uploads:
+        try:
+            # Check for duplicates (including a file repeated in this batch)
+            existing_record = existing_records.get(file_hash)
             if existing_record:
-                results.append(
-                    {
-                        "original_filename": file.filename,
-                        "status": "duplicate",
-                        "existing_record_id": existing_record.id,
-                        "credits": float(existing_record.cpe_credits),
-                    }
-                )
+                existing_id, existing_credits = existing_record
+                results[index] = {
+                    "original_filename": file.filename,
+                    "status": "duplicate",
+                    "existing_record_id": existing_id,
+                    "credits": existing_credits,
+                }
                 duplicate_count += 1
                 continue
 
-            # Extract and parse
-            extracted_text = extract_basic_text(file_content, file.filename)
-            parsed_data = parse_certificate_data(extracted_text, file.filename)
-
-            # Create database record
-            cpe_record = CPERecord(
-                user_id=user.id,
-                course_name=parsed_data["course_name"],
-                course_code=parsed_data["course_code"],
-                provider_name=parsed_data["provider_name"],
-                field_of_study=parsed_data["field_of_study"],
-                cpe_credits=parsed_data["cpe_credits"],
-                delivery_method=parsed_data["delivery_method"],
-                completion_date=parsed_data["completion_date"],
-                is_ethics=parsed_data["is_ethics"],
-                original_filename=file.filename,  # NEW
-                certificate_filename=file.filename,
-                certificate_hash=file_hash,
-                is_stored=False,  # NEW
-                storage_tier="free",  # NEW
-                nasba_sponsor_id="112530",
-                extracted_at=datetime.utcnow(),
-                extraction_confidence=0.8,
-                manually_verified=False,
-                ce_broker_submitted=False,
-            )
-
-            db.add(cpe_record)
-            db.flush()
-
-            total_credits += parsed_data["cpe_credits"]
-            saved_count += 1
+            parsed_data = parsed_by_hash[file_hash]
+            if isinstance(parsed_data, Exception):
+                raise parsed_data
 
-            results.append(
-                {
+            if file_hash in new_rows:
+                # The same file twice in this batch
+                result = {
+                    "original_filename": file.filename,
+                    "status": "duplicate",
+                    "existing_record_id": None,
+                    "credits": float(parsed_data["cpe_credits"]),
+                }
+            else:
+                new_rows[file_hash] = _cpe_record_row(
+                    user.id, parsed_data, file.filename, file_hash
+                )
+                result = {
                     "original_filename": file.filename,
                     "status": "success",
-                    "record_id": cpe_record.id,
+                    "record_id": None,
                     "credits": parsed_data["cpe_credits"],
                     "course_name": parsed_data["course_name"],
                     "completion_date": parsed_data["completion_date"].isoformat(),
                 }
-            )
-
+            results[index] = result
+            pending_results.append((result, file_hash))
         except Exception as e:
-            results.append(
+            results[index] = {
+                "original_filename": file.filename,
+                "status": "failed",
+                "error": str(e),
+            }
+            error_count += 1
+
+    # One INSERT for all the new records
+    inserted = _insert_cpe_records(db, list(new_rows.values()))
+
+    # Files a concurrent upload stored after our duplicate check
+    raced_hashes = new_rows.keys() - inserted.keys()
+    if raced_hashes:
+        existing_records.update(_existing_records(db, user.id, raced_hashes))
+
+    for result, file_hash in pending_results:
+        outcome = inserted.get(file_hash)
+        filename = result["original_filename"]
+        if outcome is None:
+            existing_id, existing_credits = existing_records[file_hash]
+            result.clear()
+            result.update(
                 {
-                    "original_filename": file.filename,
+                    "original_filename": filename,
+                    "status": "duplicate",
+                    "existing_record_id": existing_id,
+                    "credits": existing_credits,
+                }
+            )
+            duplicate_count += 1
+        elif isinstance(outcome, Exception):
+            result.clear()
+            result.update(
+                {
+                    "original_filename": filename,
                     "status": "failed",
-                    "error": str(e),
+                    "error": str(outcome),
                 }
             )
             error_count += 1
+        elif result["status"] == "duplicate":
+            result["existing_record_id"] = outcome
+            duplicate_count += 1
+        else:
+            result["record_id"] = outcome
+            total_credits += result["credits"]
+            saved_count += 1
 
     # Commit all successful records
     try:
         db.commit()
+        invalidate_certificate_caches(current_user.id)
     except Exception as e:
         db.rollback()
         raise HTTPException(
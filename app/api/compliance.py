@@ -1,7 +1,7 @@
 # app/api/compliance.py - Enhanced UX version
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import and_, func
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
@@ -227,6 +227,22 @@ def calculate_generic_reporting_period(
     )
 
 
+def load_compliance_records(db: Session, user_id: int) -> List[CPERecord]:
+    """A user's CPE records, with only the columns compliance checks read"""
+    return (
+        db.query(CPERecord)
+        .options(
+            load_only(
+                CPERecord.completion_date,
+                CPERecord.cpe_credits,
+                CPERecord.field_of_study,
+            )
+        )
+        .filter(CPERecord.user_id == user_id)
+        .all()
+    )
+
+
 def calculate_nh_compliance_detailed(
     jurisdiction: CPAJurisdiction,
     cpe_records: List[CPERecord],
@@ -463,7 +479,7 @@ async def get_nh_detailed_compliance(
         db.query(CPAJurisdiction).filter(CPAJurisdiction.code == "NH").first()
     )
 
-    cpe_records = db.query(CPERecord).filter(CPERecord.user_id == current_user.id).all()
+    cpe_records = load_compliance_records(db, current_user.id)
 
     # Calculate current period
     current_period = calculate_current_period_fixed(
@@ -600,7 +616,7 @@ async def get_dashboard_compliance(
         raise HTTPException(status_code=404, detail="Jurisdiction not found")
 
     # Get CPE records
-    cpe_records = db.query(CPERecord).filter(CPERecord.user_id == current_user.id).all()
+    cpe_records = load_compliance_records(db, current_user.id)
 
     # Calculate current period and compliance
     current_period = calculate_current_period_fixed(
@@ -636,7 +652,7 @@ async def get_detailed_compliance_report(
     )
 
     # Get CPE records
-    cpe_records = db.query(CPERecord).filter(CPERecord.user_id == current_user.id).all()
+    cpe_records = load_compliance_records(db, current_user.id)
 
     # Calculate current period
     current_period = calculate_current_period_fixed(
@@ -756,7 +772,7 @@ async def manual_compliance_check(
         )
 
     # Get CPE records
-    cpe_records = db.query(CPERecord).filter(CPERecord.user_id == current_user.id).all()
+    cpe_records = load_compliance_records(db, current_user.id)
 
     # Calculate compliance for specified scenario
     current_period = calculate_current_period_fixed(
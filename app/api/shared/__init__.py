@@ -18,6 +18,7 @@ from .ce_broker_mapping import (
     map_to_ce_broker_subjects,
     map_to_ce_broker_delivery,
     format_ce_broker_record,
+    format_ce_broker_records,
     get_ce_broker_instructions,
     CE_BROKER_SUBJECT_MAPPING,
     CE_BROKER_DELIVERY_MAPPING,
@@ -28,6 +29,7 @@ from .filename_utils import (
     generate_certificate_filename,
     generate_suggested_filename_with_extension,
     get_filename_format_info,
+    user_filename_part,
 )
 
 __all__ = [
@@ -43,6 +45,7 @@ __all__ = [
     "map_to_ce_broker_subjects",
     "map_to_ce_broker_delivery",
     "format_ce_broker_record",
+    "format_ce_broker_records",
     "get_ce_broker_instructions",
     "CE_BROKER_SUBJECT_MAPPING",
     "CE_BROKER_DELIVERY_MAPPING",
@@ -51,4 +54,5 @@ __all__ = [
     "generate_certificate_filename",
     "generate_suggested_filename_with_extension",
     "get_filename_format_info",
+    "user_filename_part",
 ]
@@ -4,7 +4,7 @@
 CE Broker format mapping utilities and constants.
 """
 
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
 
 
 # Field mapping for CE Broker compatibility
@@ -54,36 +54,64 @@ def format_ce_broker_record(cert, completion_date: str = None) -> Dict:
     Format a certificate record for CE Broker submission
 
     Args:
-        cert: CPERecord instance
+        cert: CPERecord instance, or a row with the same column attributes
         completion_date: Optional formatted date string
 
     Returns:
         Dictionary formatted for CE Broker
     """
-    # Map subjects
-    ce_subjects = map_to_ce_broker_subjects(cert.field_of_study)
+    record = next(format_ce_broker_records((cert,)))
+    if completion_date is not None:
+        record["completion_date"] = completion_date
+    return record
 
-    # Format completion date if not provided
-    if completion_date is None:
-        completion_date = (
-            cert.completion_date.strftime("%m/%d/%Y") if cert.completion_date else ""
-        )
 
-    return {
-        "course_name": cert.course_name or "Unknown Course",
-        "provider_name": cert.provider_name or "Professional Education Services",
-        "completion_date": completion_date,
-        "credits": float(cert.cpe_credits),
-        "delivery_method": map_to_ce_broker_delivery(
-            cert.delivery_method or "QAS Self-Study"
-        ),
-        "subject_areas": ", ".join(ce_subjects),
-        "course_code": cert.course_code or "",
-        "field_of_study": cert.field_of_study or "General",
-        "certificate_filename": cert.certificate_filename or "",
-        "nasba_sponsor": cert.nasba_sponsor_id or "112530",
-        "ce_broker_subjects_list": ce_subjects,  # For easier frontend handling
-    }
+# Joined "subject_areas" strings, keyed by field of study
+_SUBJECT_AREAS = {
+    field: ", ".join(subjects) for field, subjects in CE_BROKER_SUBJECT_MAPPING.items()
+}
+_DEFAULT_SUBJECTS = ["General"]
+_DEFAULT_DELIVERY = "Computer-Based Training (ie: online courses)"
+
+
+def format_ce_broker_records(certs: Iterable) -> Iterator[Dict]:
+    """
+    Format many certificate records for CE Broker submission
+
+    Yields a format_ce_broker_record() dictionary per record. The mapping
+    lookups are bound once for the whole batch, and the joined subject_areas
+    strings are precomputed, instead of being looked up per record.
+    """
+    subjects_for = CE_BROKER_SUBJECT_MAPPING.get
+    subject_areas_for = _SUBJECT_AREAS.get
+    delivery_for = CE_BROKER_DELIVERY_MAPPING.get
+    default_subjects = _DEFAULT_SUBJECTS
+    default_delivery = _DEFAULT_DELIVERY
+    # Records without a delivery method are reported as QAS Self-Study
+    self_study_delivery = delivery_for("QAS Self-Study")
+
+    for cert in certs:
+        field_of_study = cert.field_of_study
+        completion = cert.completion_date
+        delivery_method = cert.delivery_method
+        yield {
+            "course_name": cert.course_name or "Unknown Course",
+            "provider_name": cert.provider_name or "Professional Education Services",
+            "completion_date": completion.strftime("%m/%d/%Y") if completion else "",
+            "credits": float(cert.cpe_credits),
+            "delivery_method": (
+                delivery_for(delivery_method, default_delivery)
+                if delivery_method
+                else self_study_delivery
+            ),
+            "subject_areas": subject_areas_for(field_of_study, "General"),
+            "course_code": cert.course_code or "",
+            "field_of_study": field_of_study or "General",
+            "certificate_filename": cert.certificate_filename or "",
+            "nasba_sponsor": cert.nasba_sponsor_id or "112530",
+            # For easier frontend handling
+            "ce_broker_subjects_list": subjects_for(field_of_study, default_subjects),
+        }
 
 
 def get_ce_broker_instructions() -> Dict:
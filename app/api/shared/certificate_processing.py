@@ -138,10 +138,9 @@ def extract_and_parse_certificate(file_content: bytes, filename: str) -> Dict:
 def extract_text_from_file(file_content: bytes, filename: str) -> str:
     """Extract text from various file types - with fallback for missing Google Vision"""
     try:
-        from ...services.vision_service import VisionService
+        from ...services.vision_service import get_vision_service
 
-        vision = VisionService()
-        return vision.extract_text(file_content, filename)
+        return get_vision_service().extract_text(file_content, filename)
     except ImportError as e:
         print(f"Google Vision not available: {e}")
         # Fallback: return placeholder text for testing
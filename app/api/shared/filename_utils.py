@@ -5,26 +5,38 @@ Filename generation and sanitization utilities.
 """
 
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from ...models import CPERecord
 
 
+# Any run of invalid characters, whitespace and underscores becomes a single
+# underscore
+_SEPARATOR_RUN_RE = re.compile(r'[<>:"/\\|?*\s_]+')
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe file system use"""
-    # Remove or replace invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', "_", filename)
-    # Remove extra spaces and replace with underscores
-    filename = re.sub(r"\s+", "_", filename)
-    # Remove any double underscores
-    filename = re.sub(r"_+", "_", filename)
+    # Replace invalid characters and spaces, collapsing repeats, in one pass
+    filename = _SEPARATOR_RUN_RE.sub("_", filename)
     # Limit length to 200 characters (leaving room for extension)
     if len(filename) > 200:
         filename = filename[:200]
     return filename.strip("_")
 
 
+# Characters in a user's name that can't go into a download filename as-is
+# (path separators, and anything that would break the Content-Disposition
+# header)
+_USER_NAME_TABLE = str.maketrans(dict.fromkeys(' /\\";\r\n', "_"))
+
+
+def user_filename_part(full_name: Optional[str]) -> str:
+    """A user's name as it appears in report filenames"""
+    return (full_name or "user").translate(_USER_NAME_TABLE)
+
+
 def generate_certificate_filename(cert: "CPERecord") -> str:
     """Generate a meaningful filename for a certificate"""
     # Extract key components
@@ -63,10 +75,8 @@ def generate_suggested_filename_with_extension(cert: "CPERecord") -> str:
     base_filename = generate_certificate_filename(cert)
 
     # Get original extension
-    original_filename = cert.certificate_filename or ""
-    extension = ".pdf"  # Default
-    if "." in original_filename:
-        extension = "." + original_filename.split(".")[-1].lower()
+    _, dot, original_extension = (cert.certificate_filename or "").rpartition(".")
+    extension = "." + original_extension.lower() if dot else ".pdf"  # Default
 
     return base_filename + extension
 
@@ -2,15 +2,16 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.routing import APIRoute
 from datetime import datetime
 
 # Import Google Vision service for health check
 try:
-    from app.services.vision_service import VisionService
+    from app.services.vision_service import get_vision_service
 
-    vision_service = VisionService()
+    vision_service = get_vision_service()
     VISION_AVAILABLE = True
 except Exception as e:
     print(f"Warning: Google Vision not available: {e}")
@@ -21,6 +22,8 @@ app = FastAPI(
     title="SuperCPE API",
     version="2.0.0",
     description="Automated CPE Certificate Management with CE Broker Integration",
+    # orjson serializes response bodies (dicts, datetimes) several times faster
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -35,17 +38,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# FIXED: Import and include API router with better error handling
-try:
-    from app.api import api_router
+# Compress responses for clients that accept gzip - CSV exports and large JSON
+# reports shrink several times over. Streaming responses are compressed as
+# they are sent.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
-    app.include_router(api_router)
-    print("✅ API routers included successfully")
-except Exception as e:
-    print(f"❌ Failed to load API routers: {e}")
-    import traceback
+# Include the API routers. Optional routers that fail to import are logged
+# and skipped; a required one (auth, certificate_upload) raises here and
+# stops startup rather than serving an app without it.
+from app.api import include_routers
 
-    traceback.print_exc()
+include_routers(app)
+print("✅ API routers included successfully")
 
 # =================
 # CORE ENDPOINTS
@@ -8,6 +8,7 @@ from sqlalchemy import (
     Boolean,
     Float,
     ForeignKey,
+    Index,
     func,
 )
 from sqlalchemy.types import DECIMAL
@@ -92,6 +93,11 @@ class User(Base):
     cpe_records = relationship("CPERecord", back_populates="user")
     compliance_records = relationship("ComplianceRecord", back_populates="user")
 
+    __table_args__ = (
+        # Emails are stored lower-cased; this keeps them unique ignoring case
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+    )
+
 
 # =================
 # CPE TRACKING MODELS
@@ -136,6 +142,7 @@ class CPERecord(Base):
 
     # Processing Metadata
     extracted_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     extraction_confidence = Column(Float)  # AI confidence score
     manually_verified = Column(Boolean, default=False)
 
@@ -147,6 +154,27 @@ class CPERecord(Base):
     # Relationships
     user = relationship("User", back_populates="cpe_records")
 
+    __table_args__ = (
+        # Keyset pagination for /api/certificates/list, one per NOT NULL sort
+        # field (scanned backwards for descending order)
+        Index("ix_cpe_records_user_completion_id", user_id, completion_date, id),
+        Index("ix_cpe_records_user_course_name_id", user_id, course_name, id),
+        Index("ix_cpe_records_user_credits_id", user_id, cpe_credits, id),
+        # /list sorted by extraction time (and /summary's recent certificates)
+        Index("ix_cpe_records_user_extracted_id", user_id, extracted_at, id),
+        # /list filtered by field of study, in the default date order
+        Index(
+            "ix_cpe_records_user_field_completion_id",
+            user_id,
+            field_of_study,
+            completion_date,
+            id,
+        ),
+        # Duplicate checks on upload; unique so concurrent uploads of the same
+        # file resolve with INSERT ... ON CONFLICT DO NOTHING
+        Index("uq_cpe_records_user_hash", user_id, certificate_hash, unique=True),
+    )
+
 
 class ComplianceRecord(Base):
     __tablename__ = "compliance_records"
@@ -1,7 +1,7 @@
 # app/schemas/auth.py - Updated with jurisdiction support
 
 from typing import Dict
-from pydantic import BaseModel, EmailStr, Field, validator, HttpUrl
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, validator, HttpUrl
 from datetime import date, datetime
 from typing import Optional, List
 import re
@@ -77,6 +77,10 @@ class USState(str, Enum):
     WY = "WY"
 
 
+# Set of valid codes for the jurisdiction validators (built once, O(1) lookup)
+US_STATE_CODES = frozenset(state.value for state in USState)
+
+
 # =================
 # CORE AUTH SCHEMAS
 # =================
@@ -108,7 +112,7 @@ class UserRegistration(BaseModel):
     def validate_jurisdiction(cls, v):
         # Convert to uppercase and validate
         v = v.upper()
-        if v not in [state.value for state in USState]:
+        if v not in US_STATE_CODES:
             raise ValueError(f"Invalid jurisdiction. Must be a valid US state code.")
         return v
 
@@ -209,8 +213,7 @@ class UserProfile(BaseModel):
     onboarding_step: str = "registration"
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserProfileUpdate(BaseModel):
@@ -260,7 +263,7 @@ class UserProfileUpdate(BaseModel):
         if v is None:
             return v
         v = v.upper()
-        if v not in [state.value for state in USState]:
+        if v not in US_STATE_CODES:
             raise ValueError(f"Invalid jurisdiction. Must be a valid US state code.")
         return v
 
@@ -306,7 +309,7 @@ class OnboardingBasicInfo(BaseModel):
         if v is None:
             return v
         v = v.upper()
-        if v not in [state.value for state in USState]:
+        if v not in US_STATE_CODES:
             raise ValueError(f"Invalid jurisdiction. Must be a valid US state code.")
         return v
 
@@ -2,6 +2,7 @@ from google.cloud import vision
 import io
 from PIL import Image
 import os
+import threading
 
 
 class VisionService:
@@ -62,3 +63,19 @@ class VisionService:
 
         except Exception as e:
             raise Exception(f"Error extracting text from {filename}: {str(e)}")
+
+
+# One client per process: building it sets up credentials and a gRPC
+# channel, which the client then reuses (it is safe to share across threads)
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+
+def get_vision_service() -> VisionService:
+    """The process-wide VisionService, created on first use"""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_service_lock:
+            if _shared_service is None:
+                _shared_service = VisionService()
+    return _shared_service
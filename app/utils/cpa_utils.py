@@ -23,7 +23,7 @@ class CPAComplianceCalculator:
     ) -> ComplianceStatusData:
         """Calculate compliance status for a user in a specific jurisdiction"""
 
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         if not user:
             raise ValueError("User not found")
 
@@ -229,7 +229,7 @@ class CPEAnalyticsCalculator:
         )
 
         # Calculate compliance rate (simplified)
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         compliance_rate = 0.0
         if user:
             try:
@@ -570,7 +570,7 @@ class ComplianceReportGenerator:
     ) -> Dict[str, any]:
         """Generate comprehensive compliance report for a user"""
 
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         if not user:
             raise ValueError("User not found")
 
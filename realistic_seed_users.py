@@ -8,25 +8,23 @@ Usage:
   Create users: python realistic_seed_users.py
   Delete users: python realistic_seed_users.py --delete
   Show users:   python realistic_seed_users.py --show
+
+Like the app, this needs SECRET_KEY set (or DEBUG=true for the dev key).
 """
 
 import os
 import sys
 from datetime import date, datetime
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
 # Add the app directory to the path so we can import our models
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 from app.core.database import engine, SessionLocal
 from app.models import User
+# The app's own hashing, so seeded passwords follow its bcrypt cost
+from app.api.auth import get_password_hash as hash_password
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
 def create_realistic_test_users():
     """
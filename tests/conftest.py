@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# auth refuses to import without a signing key
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
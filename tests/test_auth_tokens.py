@@ -0,0 +1,160 @@
+"""HS256 token signing and verification in app.api.auth"""
+
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from app.api import auth
+from app.api.auth import InvalidTokenError, create_access_token, decode_token
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _pyjwt_token(exp, key=None, algorithm="HS256", **claims):
+    payload = {"sub": "user@example.com", "user_id": 7, "exp": exp, **claims}
+    return jwt.encode(payload, key or auth.SECRET_KEY, algorithm=algorithm)
+
+
+def test_round_trip():
+    payload = decode_token(create_access_token("user@example.com", 7))
+
+    assert payload["sub"] == "user@example.com"
+    assert payload["user_id"] == 7
+    assert payload["exp"] > time.time()
+
+
+def test_email_is_escaped_in_payload():
+    email = 'odd"name\\@example.com'
+
+    assert decode_token(create_access_token(email, 1))["sub"] == email
+
+
+def test_accepts_pyjwt_issued_token():
+    # Sessions issued before PyJWT was dropped must still validate
+    token = _pyjwt_token(datetime.utcnow() + timedelta(minutes=30))
+
+    payload = decode_token(token)
+
+    assert payload["sub"] == "user@example.com"
+    assert payload["user_id"] == 7
+
+
+def test_issued_token_verifies_with_pyjwt():
+    token = create_access_token("user@example.com", 7)
+
+    payload = jwt.decode(token, auth.SECRET_KEY, algorithms=["HS256"])
+
+    assert payload["user_id"] == 7
+
+
+def test_rejects_tampered_signature():
+    header, payload, signature = create_access_token("user@example.com", 7).split(".")
+    flipped = signature[:5] + ("A" if signature[5] != "A" else "B") + signature[6:]
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.{flipped}")
+
+
+def test_rejects_tampered_payload():
+    header, _, signature = create_access_token("user@example.com", 7).split(".")
+    forged = _b64(b'{"sub":"user@example.com","user_id":1,"exp":9999999999}')
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{forged}.{signature}")
+
+
+def test_rejects_token_signed_with_another_key():
+    token = _pyjwt_token(time.time() + 600, key="some-other-key")
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+def test_rejects_alg_none():
+    header = _b64(b'{"alg":"none","typ":"JWT"}')
+    payload = _b64(b'{"sub":"user@example.com","user_id":7,"exp":9999999999}')
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.")
+
+
+def test_rejects_other_algorithm():
+    token = _pyjwt_token(time.time() + 600, algorithm="HS512")
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["", "abc", "abc.def", "a.b.c.d", "...", "not a token"],
+)
+def test_rejects_malformed_segments(token):
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+def test_rejects_extra_segment_on_valid_token():
+    token = create_access_token("user@example.com", 7)
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token + ".extra")
+
+
+def test_rejects_bad_base64_signature():
+    header, payload, _ = create_access_token("user@example.com", 7).split(".")
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.@@@")
+
+
+def test_rejects_non_json_payload():
+    header = create_access_token("user@example.com", 7).split(".")[0]
+    payload = _b64(b"not json")
+    signing_input = f"{header}.{payload}".encode()
+    signature = _b64(auth._sign(signing_input))
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.{signature}")
+
+
+def test_rejects_non_ascii_token():
+    with pytest.raises(InvalidTokenError):
+        decode_token("é.é.é")
+
+
+def test_rejects_expired_token():
+    token = _pyjwt_token(int(time.time()) - 1)
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+def test_rejects_token_without_exp():
+    token = jwt.encode({"sub": "user@example.com", "user_id": 7}, auth.SECRET_KEY)
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+def test_rejects_non_numeric_exp():
+    token = _pyjwt_token("tomorrow")
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token)
+
+
+def test_rejects_non_object_payload():
+    header = create_access_token("user@example.com", 7).split(".")[0]
+    payload = _b64(json.dumps([1, 2, 3]).encode())
+    signing_input = f"{header}.{payload}".encode()
+    signature = _b64(auth._sign(signing_input))
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(f"{header}.{payload}.{signature}")